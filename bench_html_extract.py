@@ -0,0 +1,130 @@
+# bench_html_extract.py
+# Compare the lxml main-content extractor (html_text.extract_html_text) with
+# the previous BeautifulSoup one (html_text.soup_text) on saved pages.
+#
+#   python bench_html_extract.py --save-url https://... https://...   # add pages to the corpus
+#   python bench_html_extract.py --news "Tata Motors" --sample 20     # add Google News stories
+#   python bench_html_extract.py                                       # benchmark the corpus
+#
+# Pages are kept in data/cache/html_corpus. Per extractor it reports ms per
+# page (best of --repeat), GPT tokens of the output, and how much of the
+# lxml output's vocabulary is also in the BeautifulSoup output (low values
+# would mean lxml invented or mangled text rather than just dropping chrome).
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+
+import requests
+
+from boilerplate import count_tokens
+from html_text import extract_html_text, soup_text
+
+CORPUS_DIR = "data/cache/html_corpus"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+EXTRACTORS = {
+    "soup": soup_text,
+    "lxml": lambda page: extract_html_text(page, main_content=False),
+    "lxml-main": extract_html_text,
+}
+
+
+def save_pages(urls, corpus_dir=CORPUS_DIR):
+    os.makedirs(corpus_dir, exist_ok=True)
+    for url in urls:
+        path = os.path.join(corpus_dir, hashlib.sha1(url.encode()).hexdigest()[:16] + ".html")
+        if os.path.exists(path):
+            continue
+        try:
+            response = requests.get(url, headers=HEADERS, timeout=15)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"  ! {url}: {e}")
+            continue
+        if "text/html" not in response.headers.get("Content-Type", ""):
+            print(f"  ! {url}: not HTML")
+            continue
+        with open(path, "wb") as f:
+            f.write(response.content)
+        print(f"  + {url}")
+
+
+def news_urls(query, sample):
+    import feedparser
+    feed = feedparser.parse(f"https://news.google.com/rss/search?q={query.replace(' ', '%20')}&hl=en-IN&gl=IN&ceid=IN:en")
+    return [entry.link for entry in feed.entries[:sample]]
+
+
+def vocabulary(text):
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def bench(pages, repeat):
+    results, texts = {}, {}
+    for name, extract in EXTRACTORS.items():
+        seconds, tokens, errors, out = 0.0, 0, 0, {}
+        for path, page in pages.items():
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                try:
+                    text = extract(page)
+                except Exception as e:
+                    errors += 1
+                    print(f"  {name}: {os.path.basename(path)}: {type(e).__name__}: {e}")
+                    break
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            else:
+                seconds += best
+                tokens += count_tokens(text)
+                out[path] = text
+        texts[name] = out
+        results[name] = {"ms_per_page": round(seconds / max(len(out), 1) * 1000, 2),
+                         "tokens": tokens, "errors": errors}
+    for name in EXTRACTORS:
+        shared = [p for p in texts[name] if p in texts["soup"]]
+        overlap = [len(vocabulary(texts[name][p]) & vocabulary(texts["soup"][p])) / max(len(vocabulary(texts[name][p])), 1)
+                   for p in shared]
+        results[name]["in_soup"] = round(sum(overlap) / len(overlap), 3) if overlap else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction on saved pages")
+    parser.add_argument("--corpus-dir", default=CORPUS_DIR)
+    parser.add_argument("--save-url", nargs="+", default=[], help="fetch these pages into the corpus")
+    parser.add_argument("--news", default=None, help="fetch Google News stories for this query")
+    parser.add_argument("--sample", type=int, default=20, help="stories to fetch with --news")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per page, best is kept")
+    args = parser.parse_args()
+
+    urls = list(args.save_url) + (news_urls(args.news, args.sample) if args.news else [])
+    if urls:
+        save_pages(urls, args.corpus_dir)
+    paths = sorted(glob.glob(os.path.join(args.corpus_dir, "*.htm*")))
+    print(f"Corpus: {len(paths)} pages in {args.corpus_dir}")
+    if not paths:
+        return
+    pages = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            pages[path] = f.read()
+    size = sum(len(p) for p in pages.values())
+
+    results = bench(pages, args.repeat)
+    print(f"\n{'extractor':>10} {'ms/page':>9} {'tokens':>9} {'errors':>7} {'in soup':>8}   ({size / 2**20:.1f} MB of HTML)")
+    for name, r in results.items():
+        print(f"{name:>10} {r['ms_per_page']:>9} {r['tokens']:>9} {r['errors']:>7} {r['in_soup']:>8}")
+    soup, main = results["soup"], results["lxml-main"]
+    if soup["ms_per_page"] and soup["tokens"]:
+        print(f"\nlxml-main vs soup: {soup['ms_per_page'] / max(main['ms_per_page'], 0.01):.1f}x faster, "
+              f"{100 * (1 - main['tokens'] / soup['tokens']):.0f}% fewer tokens")
+
+
+if __name__ == "__main__":
+    main()
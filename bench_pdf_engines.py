@@ -0,0 +1,183 @@
+# bench_pdf_engines.py
+# Compare the PDF text engines in pdf_text.py on real BSE filings and pick
+# the fastest acceptable one for this deployment.
+#
+#   python bench_pdf_engines.py --sample 60            # build/refresh corpus, benchmark
+#   python bench_pdf_engines.py --corpus-only --sample 200
+#   python bench_pdf_engines.py --save                 # also write PDF_ENGINE_FILE
+#
+# The corpus is a random sample of the attachment URLs in the ticker CSVs,
+# downloaded once into data/cache/pdf_corpus. Per engine it reports
+# pages/s on full documents, ms per document for the 4,000-char GPT budget,
+# errors/empty outputs, and fidelity: word-level F1 against a reference
+# engine (pdfminer when installed, its layout analysis being the most
+# faithful; otherwise PyPDF2, which then scores 1.0 against itself).
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import shutil
+import time
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+from extract_pool import ExtractionPool
+from ingest_index import attachment_name
+from pdf_text import ENGINES, PDF_ENGINE_FILE, available_engines, iter_pdf_pages
+
+CSV_DIR = "data/portfolio_stocks_gpt"
+CORPUS_DIR = "data/cache/pdf_corpus"
+GPT_BUDGET = 4000
+
+
+def build_corpus(sample, corpus_dir=CORPUS_DIR, csv_dir=CSV_DIR, seed=0):
+    """Download a random sample of the CSVs' attachments into corpus_dir (kept between runs)."""
+    from bse_http import ResponseTooLarge
+    from data_loader import download_attachment  # pulls in streamlit; only needed here
+    os.makedirs(corpus_dir, exist_ok=True)
+    urls = []
+    for csv_path in glob.glob(os.path.join(csv_dir, "*.csv")):
+        try:
+            urls += pd.read_csv(csv_path, usecols=["url"])["url"].dropna().astype(str).tolist()
+        except Exception:
+            continue
+    names = sorted({attachment_name(u) for u in urls if u.lower().endswith(".pdf")})
+    random.Random(seed).shuffle(names)
+    have = set(os.listdir(corpus_dir))
+    for name in names[:sample]:
+        if name in have:
+            continue
+        try:
+            path, url = download_attachment(name)
+        except ResponseTooLarge:
+            print(f"  ! {name} is over MAX_PDF_BYTES")
+            continue
+        if path:
+            shutil.copyfile(path, os.path.join(corpus_dir, name))
+            print(f"  + {name}")
+        else:
+            print(f"  ! could not download {name}")
+    return sorted(glob.glob(os.path.join(corpus_dir, "*.pdf")))
+
+
+def extract_counting(path, engine, max_chars=None):
+    """(text, pages_read) -- runs in the extraction worker."""
+    pages = iter_pdf_pages(path, engine)
+    parts, size, n = [], 0, 0
+    try:
+        for t in pages:
+            parts.append(t)
+            size += len(t) + 1
+            n += 1
+            if max_chars and size >= max_chars:
+                break
+    finally:
+        pages.close()
+    return "\n".join(parts), n
+
+
+def word_f1(text, reference):
+    a = Counter(re.findall(r"\w+", text.lower()))
+    b = Counter(re.findall(r"\w+", reference.lower()))
+    if not a and not b:
+        return 1.0
+    common = sum((a & b).values())
+    if not common:
+        return 0.0
+    precision, recall = common / sum(a.values()), common / sum(b.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def bench_engine(pool, engine, corpus):
+    texts, pages, seconds, errors, empty, budget_seconds = {}, 0, 0.0, 0, 0, 0.0
+    for path in corpus:
+        t0 = time.perf_counter()
+        try:
+            text, n = pool.run(extract_counting, path, engine)
+        except Exception as e:
+            errors += 1
+            print(f"  {engine}: {os.path.basename(path)}: {type(e).__name__}: {e}")
+            continue
+        seconds += time.perf_counter() - t0
+        pages += n
+        texts[path] = text
+        if not text.strip():
+            empty += 1
+        t0 = time.perf_counter()
+        try:
+            pool.run(extract_counting, path, engine, GPT_BUDGET)
+            budget_seconds += time.perf_counter() - t0
+        except Exception:
+            pass
+    ok = max(len(texts), 1)
+    return texts, {
+        "docs": len(corpus), "pages": pages, "errors": errors, "empty": empty,
+        "pages_per_s": round(pages / seconds, 1) if seconds else 0.0,
+        "budget_ms_per_doc": round(budget_seconds / ok * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text engines on BSE filings")
+    parser.add_argument("--sample", type=int, default=60, help="filings to have in the corpus")
+    parser.add_argument("--corpus-dir", default=CORPUS_DIR)
+    parser.add_argument("--corpus-only", action="store_true", help="just download the corpus")
+    parser.add_argument("--no-download", action="store_true", help="use the corpus as it is")
+    parser.add_argument("--engines", nargs="+", default=None, help=f"subset of {list(ENGINES)}")
+    parser.add_argument("--reference", default=None, help="engine fidelity is measured against")
+    parser.add_argument("--min-fidelity", type=float, default=0.85)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds per document")
+    parser.add_argument("--save", action="store_true", help=f"write the pick to {PDF_ENGINE_FILE}")
+    args = parser.parse_args()
+
+    if args.no_download:
+        corpus = sorted(glob.glob(os.path.join(args.corpus_dir, "*.pdf")))
+    else:
+        corpus = build_corpus(args.sample, args.corpus_dir)
+    print(f"Corpus: {len(corpus)} PDFs in {args.corpus_dir}")
+    if args.corpus_only or not corpus:
+        return
+
+    installed = available_engines()
+    engines = [e for e in (args.engines or list(ENGINES)) if e in installed]
+    missing = [e for e in (args.engines or list(ENGINES)) if e not in installed]
+    if missing:
+        print(f"Not installed, skipped: {missing}")
+    reference = args.reference or ("pdfminer" if "pdfminer" in engines else engines[0])
+
+    texts, results = {}, {}
+    with ExtractionPool(workers=1, timeout=args.timeout) as pool:
+        for engine in engines:
+            texts[engine], results[engine] = bench_engine(pool, engine, corpus)
+    for engine in engines:
+        shared = [p for p in texts[engine] if p in texts[reference]]
+        scores = [word_f1(texts[engine][p], texts[reference][p]) for p in shared]
+        results[engine]["fidelity"] = round(sum(scores) / len(scores), 3) if scores else 0.0
+
+    print(f"\n{'engine':>10} {'docs':>5} {'pages':>6} {'pages/s':>8} {'4k ms/doc':>10}"
+          f" {'errors':>7} {'empty':>6} {'fidelity':>9}   (reference: {reference})")
+    for engine, r in results.items():
+        print(f"{engine:>10} {r['docs']:>5} {r['pages']:>6} {r['pages_per_s']:>8} {r['budget_ms_per_doc']:>10}"
+              f" {r['errors']:>7} {r['empty']:>6} {r['fidelity']:>9}")
+
+    ref_failures = results[reference]["errors"] + results[reference]["empty"]
+    acceptable = [e for e, r in results.items()
+                  if r["fidelity"] >= args.min_fidelity and r["errors"] + r["empty"] <= ref_failures + 0.02 * len(corpus)]
+    pick = max(acceptable, key=lambda e: results[e]["pages_per_s"]) if acceptable else reference
+    print(f"\nFastest acceptable engine: {pick}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(PDF_ENGINE_FILE) or ".", exist_ok=True)
+        with open(PDF_ENGINE_FILE, "w") as f:
+            json.dump({"engine": pick, "reference": reference, "results": results,
+                       "corpus": len(corpus), "at": datetime.now().isoformat(timespec="seconds")}, f, indent=2)
+        print(f"Saved to {PDF_ENGINE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
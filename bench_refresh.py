@@ -0,0 +1,177 @@
+# bench_refresh.py
+# End-to-end refresh benchmark against the local stand-in BSE server and
+# its fake chat-completions endpoint (no bseindia.com, no OpenAI).
+#
+#   python bench_refresh.py --workers 1 8 16 --filings 3 --gpt-latency 0.5
+#   python bench_refresh.py --workers 8 --error-rate 0.05 --rate-limit 20 --his-share 0.3
+#
+# Per run it reports filings/min, p50/p99 per-filing latency (first listed
+# by the API -> row written to the CSV) and peak RSS of the refresh process
+# plus its extraction workers.
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+
+import blob_cache
+import boilerplate
+import text_cache
+import data_loader
+import llm_cache
+from filing_pipeline import format_metrics
+from fake_bse_server import FakeBse, start_server
+from ingest_index import attachment_name
+
+
+def fake_call_gpt(latency):
+    def call_gpt(raw_input_text: str):
+        time.sleep(latency)
+        return json.dumps({"summary": "Not important. Benchmark filing.", "sentiment": 0, "category": "benchmark"})
+    return call_gpt
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _descendants(pid):
+    out = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                out += [int(c) for c in f.read().split()]
+    except OSError:
+        return out
+    for child in list(out):
+        out += _descendants(child)
+    return out
+
+
+class PeakMemory:
+    """Samples RSS of this process + its children (Linux /proc) and keeps the peak."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes(pid) + sum(_rss_bytes(c) for c in _descendants(pid)))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        if not self.peak:  # no /proc: lifetime high-water mark of this process only
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def run_once(fake, workers, max_downloads=None, max_gpt_calls=None, sweep=False, triage=True):
+    """Returns (filings, seconds, per-filing latencies, peak RSS bytes, last pipeline metrics or None)."""
+    last_metrics = []
+    done_at = {}
+    append_records = data_loader.append_records
+
+    def timed_append(csv_path, new_records, index=None):
+        append_records(csv_path, new_records, index)
+        now = time.monotonic()
+        for rec in new_records:
+            done_at[attachment_name(rec['url'])] = now
+
+    fake.listed_at.clear()
+    data_loader.append_records = timed_append
+    try:
+        with tempfile.TemporaryDirectory() as out_dir, PeakMemory() as mem:
+            blob_cache.BLOB_CACHE_DIR = f"{out_dir}/blobs"  # cold caches per run
+            text_cache.TEXT_CACHE_DIR = f"{out_dir}/text"
+            boilerplate.BOILERPLATE_DB = f"{out_dir}/boilerplate.sqlite"
+            llm_cache.LLM_CACHE_PATH = f"{out_dir}/llm_cache.sqlite"
+            t0 = time.perf_counter()
+            count = data_loader.update_filings_data(
+                days=2, max_workers=workers, max_downloads=max_downloads,
+                max_gpt_calls=max_gpt_calls, output_dir=out_dir, upload=False,
+                metrics_callback=lambda m: last_metrics.append(m), sweep=sweep, triage=triage
+            )
+            elapsed = time.perf_counter() - t0
+    finally:
+        data_loader.append_records = append_records
+    latencies = sorted(t - fake.listed_at[a] for a, t in done_at.items() if a in fake.listed_at)
+    return count, elapsed, latencies, mem.peak, (last_metrics[-1] if last_metrics else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end refresh throughput, latency and memory")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--filings", type=int, default=3, help="filings per scrip")
+    parser.add_argument("--api-latency", type=float, default=0.2)
+    parser.add_argument("--pdf-latency", type=float, default=0.3)
+    parser.add_argument("--gpt-latency", type=float, default=0.8)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of BSE requests failing with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="BSE requests/s per endpoint before 429")
+    parser.add_argument("--his-share", type=float, default=0.0, help="share of PDFs only on AttachHis")
+    parser.add_argument("--in-process-gpt", action="store_true",
+                        help="replace call_gpt with a sleep instead of the fake chat-completions endpoint")
+    parser.add_argument("--max-downloads", type=int, default=None)
+    parser.add_argument("--max-gpt-calls", type=int, default=None)
+    parser.add_argument("--sweep", action="store_true", help="market-wide sweep instead of per-scrip paging")
+    parser.add_argument("--no-triage", action="store_true", help="download and summarize every filing")
+    args = parser.parse_args()
+
+    fake = FakeBse([tk["bse_code"] for tk in data_loader.tickers], filings_per_scrip=args.filings,
+                   api_latency=args.api_latency, pdf_latency=args.pdf_latency, gpt_latency=args.gpt_latency,
+                   error_rate=args.error_rate, rate_limit=args.rate_limit, his_share=args.his_share)
+    server, base_url = start_server(fake)
+    data_loader.BSE_API = f"{base_url}/BseIndiaAPI/api/AnnSubCategoryGetData/w"
+    data_loader.BSE_ATTACH_BASE = f"{base_url}/xml-data/corpfiling"
+    if args.in_process_gpt:
+        data_loader.call_gpt = fake_call_gpt(args.gpt_latency)
+    else:
+        os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+    baseline = None
+    print(f"{'workers':>8} {'filings':>8} {'seconds':>8} {'filings/min':>12} {'speedup':>8}"
+          f" {'p50 s':>7} {'p99 s':>7} {'peak MB':>8} {'api':>6} {'pdf':>6} {'gpt':>6} {'503':>5} {'429':>5}")
+    try:
+        for workers in args.workers:
+            before = (fake.api_requests, fake.pdf_requests, fake.gpt_requests, fake.errors, fake.throttled)
+            count, elapsed, latencies, peak, metrics = run_once(
+                fake, workers, args.max_downloads, args.max_gpt_calls, args.sweep, not args.no_triage)
+            api, pdf, gpt, errors, throttled = (now - was for now, was in zip(
+                (fake.api_requests, fake.pdf_requests, fake.gpt_requests, fake.errors, fake.throttled), before))
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {count:>8} {elapsed:>8.1f} {count / elapsed * 60:>12.1f} {baseline / elapsed:>7.1f}x"
+                  f" {percentile(latencies, 50):>7.2f} {percentile(latencies, 99):>7.2f} {peak / 2**20:>8.0f}"
+                  f" {api:>6} {pdf:>6} {gpt:>6} {errors:>5} {throttled:>5}")
+            if metrics:
+                print(f"{'':>8} {format_metrics(metrics)}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
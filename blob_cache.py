@@ -0,0 +1,184 @@
+# blob_cache.py
+# Content-addressed on-disk cache for downloaded documents (BSE filing PDFs,
+# bonus-summary URLs). Blobs are stored once per SHA-256 under
+# <root>/<sha[:2]>/<sha>; a SQLite index maps names (attachment names or URLs)
+# to hashes and tracks last use for size-bounded LRU eviction.
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", "data/cache/blobs")
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha         TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    created     REAL,
+    last_used   REAL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs(last_used);
+CREATE TABLE IF NOT EXISTS names (
+    name         TEXT PRIMARY KEY,
+    sha          TEXT NOT NULL,
+    source_url   TEXT,
+    content_type TEXT
+);
+CREATE INDEX IF NOT EXISTS names_sha ON names(sha);
+"""
+
+
+class BlobCache:
+    def __init__(self, root=BLOB_CACHE_DIR, max_bytes=BLOB_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            self.db.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, sha):
+        return os.path.join(self.root, sha[:2], sha)
+
+    # --- by content hash ---
+
+    def put_bytes(self, data: bytes) -> str:
+        """Store data (if new) and return its SHA-256."""
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)  # atomic: readers never see a partial blob
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT INTO blobs(sha, size, created, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sha) DO UPDATE SET last_used=excluded.last_used",
+                (sha, len(data), now, now)
+            )
+        self._evict()
+        return sha
+
+    def put_stream(self, fileobj, chunk_size=1024 * 1024) -> str:
+        """Like put_bytes, but copies from a file object without loading it whole."""
+        h = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.root)
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+                h.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        sha = h.hexdigest()
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT INTO blobs(sha, size, created, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sha) DO UPDATE SET last_used=excluded.last_used",
+                (sha, size, now, now)
+            )
+        self._evict()
+        return sha
+
+    def get_bytes(self, sha):
+        try:
+            with open(self._path(sha), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock, self.db:
+            self.db.execute("UPDATE blobs SET last_used=? WHERE sha=?", (time.time(), sha))
+        return data
+
+    # --- by name (attachment name / URL) ---
+
+    def put(self, name, data, source_url=None, content_type=None) -> str:
+        """data: bytes or a readable binary file object."""
+        sha = self.put_bytes(data) if isinstance(data, (bytes, bytearray)) else self.put_stream(data)
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO names(name, sha, source_url, content_type) VALUES (?, ?, ?, ?)",
+                (name, sha, source_url, content_type)
+            )
+        return sha
+
+    def lookup(self, name):
+        """(sha, source_url, content_type) for a name, or None. Does not touch the blob."""
+        with self._lock:
+            row = self.db.execute("SELECT sha, source_url, content_type FROM names WHERE name=?",
+                                  (name,)).fetchone()
+        return tuple(row) if row else None
+
+    def get(self, name):
+        """(data, source_url, content_type) for a cached name, or None."""
+        entry = self.lookup(name)
+        data = self.get_bytes(entry[0]) if entry else None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data, entry[1], entry[2]
+
+    def get_path(self, name):
+        """(blob_path, source_url, content_type) for a cached name, or None."""
+        entry = self.lookup(name)
+        path = self._path(entry[0]) if entry else None
+        if path is None or not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._lock, self.db:
+            self.db.execute("UPDATE blobs SET last_used=? WHERE sha=?", (time.time(), entry[0]))
+        return path, entry[1], entry[2]
+
+    # --- eviction ---
+
+    def total_bytes(self):
+        with self._lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _evict(self):
+        """Drop least-recently-used blobs (and their names) until under max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        with self._lock:
+            victims = self.db.execute("SELECT sha, size FROM blobs ORDER BY last_used").fetchall()
+        for sha, size in victims:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(sha))
+            except OSError:
+                pass
+            with self._lock, self.db:
+                self.db.execute("DELETE FROM blobs WHERE sha=?", (sha,))
+                self.db.execute("DELETE FROM names WHERE sha=?", (sha,))
+            total -= size
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_blob_cache(root=None):
+    """Process-wide shared cache per directory (opened on first use)."""
+    root = root or BLOB_CACHE_DIR
+    with _cache_lock:
+        if root not in _caches:
+            _caches[root] = BlobCache(root)
+        return _caches[root]
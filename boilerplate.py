@@ -0,0 +1,247 @@
+# boilerplate.py
+# Strips corporate boilerplate from filing text before it goes to GPT.
+#
+# A BSE filing typically opens with the company letterhead, the exchange
+# addresses ("BSE Limited, Phiroze Jeejeebhoy Towers, Dalal Street ..."),
+# Scrip Code / Symbol / CIN blocks, and ends with "Thanking you, Yours
+# faithfully, Company Secretary". Three kinds of lines are removed:
+#   - lines matching GENERIC_PATTERNS (exchange addresses, codes, salutations);
+#   - in the letterhead/signature area of a page (its first and last
+#     EDGE_LINES lines), lines repeated earlier in the document (page
+#     headers/footers) and lines this company has in at least MIN_SHARE of
+#     its past filings (letterhead, registered office, signatory). Those are
+#     learned from persisted filings and kept as hashes in a small SQLite file.
+# Figures and short table labels ("Total income", "1,246.86") are never
+# removed by the last two rules: results tables repeat them legitimately.
+# Long lines are never stripped either: PDF extraction sometimes glues a
+# header onto a paragraph, and losing the paragraph would cost more than it
+# saves. Pages are separated by form feeds (see pdf_text.extract_pdf_text).
+#
+#   python boilerplate.py --learn     # learn from filings in the text cache
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+BOILERPLATE_DB = os.getenv("BOILERPLATE_DB", "data/cache/boilerplate.sqlite")
+MIN_FILINGS = 3      # a company's lines are judged once it has this many filings
+MIN_SHARE = 0.5      # ... and a line is boilerplate if in this share of them
+MAX_LINE_CHARS = 160
+EDGE_LINES = 8       # letterhead / signature area at the top and bottom of each page
+LABEL_WORDS = 4      # lines of up to this many words without punctuation look like table labels
+
+GENERIC_PATTERNS = [re.compile(p, re.I) for p in [
+    r"^to,?$|^(to,?\s*)?(the\s+)?(bse|national stock exchange|metropolitan stock exchange|msei)\b.*\b(ltd|limited|india)\b",
+    r"phiroze\s*jeejeebhoy|dalal\s+street|exchange\s+plaza|bandra\s*[- ]?\s*kurla|fort,?\s+mumbai",
+    r"^(the\s+)?(general\s+manager|manager|listing\s+(department|compliance)|corporate\s+relation(ship)?s?\s+department|dept\.? of corporate services)",
+    r"^(bse\s+)?scrip\s+(code|id)\b|^(nse\s+)?symbol\s*[:\-]|^isin\s*[:\-]|^security\s+(code|id)\s*[:\-]",
+    r"^(cin|corporate identity number)\s*[:\-]?\s*[lu]\d{5}",
+    r"^(dear\s+sir|dear\s+madam|sir\s*/\s*madam|ref\s*[:\-.]|thank(ing|s)?\s+you|yours\s+(faithfully|truly|sincerely))",
+    r"^(for\s+and\s+on\s+behalf\s+of|for\s+.{2,60}\b(ltd|limited)\.?$|\(?company\s+secretary|compliance\s+officer|membership\s+no|encl(osure)?s?\b|place\s*[:\-])",
+    r"^(tel|phone|ph|fax|mob(ile)?|e-?mail|website|web)\s*(no\.?)?\s*[:.\-]|www\.|@[a-z0-9-]+\.(com|in|co\.in)\b",
+    r"^(regd\.?|registered)\s+office\b|^corporate\s+office\b",
+    r"^page\s+\d+(\s+of\s+\d+)?$",
+]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    ticker  TEXT PRIMARY KEY,
+    filings INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lines (
+    ticker  TEXT NOT NULL,
+    line    TEXT NOT NULL,   -- hash of the normalized line
+    seen    INTEGER NOT NULL,
+    PRIMARY KEY (ticker, line)
+);
+"""
+
+
+def normalize_line(line):
+    """Case, spacing and digits (dates, page numbers) don't make a line different."""
+    return re.sub(r"\d+", "0", re.sub(r"\s+", " ", line.strip().lower()))
+
+
+def line_key(norm):
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16]
+
+
+def count_tokens(text):
+    """GPT tokens in text (tiktoken when installed, else the ~4 chars/token rule)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return (len(text) + 3) // 4
+    return len(tiktoken.get_encoding("o200k_base").encode(text))
+
+
+def is_generic(line):
+    return any(p.search(line) for p in GENERIC_PATTERNS)
+
+
+def is_table_line(line):
+    """Figures ("1,246.86", "12.3 %") and short row labels ("Total income") -- never learned or deduped."""
+    chars = [c for c in line if not c.isspace()]
+    if chars and sum(c.isdigit() for c in chars) / len(chars) >= 0.3:
+        return True
+    return len(line.split()) <= LABEL_WORDS and not re.search(r"[:,;@/]", line)
+
+
+def edge_lines(text):
+    """(line, in_edge) for the non-empty lines of text, page by page."""
+    for page in text.split("\f"):
+        lines = [l.strip() for l in page.splitlines() if l.strip()]
+        for i, line in enumerate(lines):
+            yield line, i < EDGE_LINES or i >= len(lines) - EDGE_LINES
+
+
+class BoilerplateModel:
+    def __init__(self, path=BOILERPLATE_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            self.db.executescript(SCHEMA)
+        self.filings = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def forget(self, ticker):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM companies WHERE ticker=?", (ticker,))
+            self.db.execute("DELETE FROM lines WHERE ticker=?", (ticker,))
+
+    def learned(self, ticker):
+        """Hashes of the lines that are boilerplate for this company."""
+        with self._lock:
+            row = self.db.execute("SELECT filings FROM companies WHERE ticker=?", (ticker,)).fetchone()
+            if not row or row[0] < MIN_FILINGS:
+                return set()
+            need = max(2, int(row[0] * MIN_SHARE + 0.999))
+            rows = self.db.execute("SELECT line FROM lines WHERE ticker=? AND seen>=?", (ticker, need)).fetchall()
+        return {r[0] for r in rows}
+
+    def observe(self, ticker, text):
+        """Count the distinct letterhead/signature-area lines of one more filing of this company."""
+        keys = {line_key(normalize_line(l)) for l, edge in edge_lines(text)
+                if edge and len(l) <= MAX_LINE_CHARS and not is_table_line(l)}
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT INTO companies(ticker, filings) VALUES (?, 1) "
+                "ON CONFLICT(ticker) DO UPDATE SET filings=filings+1", (ticker,))
+            self.db.executemany(
+                "INSERT INTO lines(ticker, line, seen) VALUES (?, ?, 1) "
+                "ON CONFLICT(ticker, line) DO UPDATE SET seen=seen+1", [(ticker, k) for k in keys])
+            filings = self.db.execute("SELECT filings FROM companies WHERE ticker=?", (ticker,)).fetchone()[0]
+            if filings % 50 == 0:  # forget one-off lines that can't reach MIN_SHARE any time soon
+                self.db.execute("DELETE FROM lines WHERE ticker=? AND seen*10 < ?", (ticker, filings))
+
+    def strip(self, ticker, text):
+        """(stripped_text, lines_removed) using generic rules + this company's learned lines."""
+        learned = self.learned(ticker)
+        kept, seen, removed = [], set(), 0
+        for line, edge in edge_lines(text):
+            if len(line) <= MAX_LINE_CHARS:
+                if is_generic(line):
+                    removed += 1
+                    continue
+                if edge and not is_table_line(line) and (line in seen or line_key(normalize_line(line)) in learned):
+                    removed += 1
+                    continue
+            seen.add(line)
+            kept.append(line)
+        return "\n".join(kept), removed
+
+
+_models = {}
+_model_lock = threading.Lock()
+
+
+def get_boilerplate_model(path=None):
+    """Process-wide model per database file (opened on first use)."""
+    path = path or BOILERPLATE_DB
+    with _model_lock:
+        if path not in _models:
+            _models[path] = BoilerplateModel(path)
+        return _models[path]
+
+
+def strip_boilerplate(ticker, text):
+    """
+    Filing text without boilerplate, judged against the company's earlier
+    filings. Returns (text, tokens_before, tokens_after). Nothing is learned
+    here -- call learn_boilerplate once the filing is persisted, so retries
+    and resumed jobs don't count a filing twice.
+    """
+    model = get_boilerplate_model()
+    stripped, _ = model.strip(ticker, text)
+    before, after = count_tokens(text), count_tokens(stripped)
+    with model._lock:
+        model.filings += 1
+        model.tokens_before += before
+        model.tokens_after += after
+    return stripped, before, after
+
+
+def learn_boilerplate(ticker, text):
+    """Count a persisted filing's letterhead/signature lines towards its company's boilerplate."""
+    get_boilerplate_model().observe(ticker, text)
+
+
+def boilerplate_stats():
+    model = get_boilerplate_model()
+    with model._lock:
+        saved = model.tokens_before - model.tokens_after
+        return {"filings": model.filings, "tokens_saved": saved,
+                "saved_pct": round(100 * saved / model.tokens_before, 1) if model.tokens_before else 0.0}
+
+
+def learn_from_history(csv_dir, max_chars, log=print):
+    """Learn every company's boilerplate from its filings already in the text cache."""
+    import pandas as pd
+    from blob_cache import get_blob_cache
+    from ingest_index import attachment_name
+    from pdf_text import default_engine
+    from text_cache import get_text_cache
+
+    model, blobs, texts = get_boilerplate_model(), get_blob_cache(), get_text_cache()
+    for csv_path in sorted(glob.glob(os.path.join(csv_dir, "*.csv"))):
+        ticker = os.path.splitext(os.path.basename(csv_path))[0]
+        try:
+            urls = pd.read_csv(csv_path, usecols=["url"])["url"].dropna().astype(str)
+        except Exception:
+            continue
+        model.forget(ticker)  # relearn from scratch, don't count filings twice
+        n = 0
+        for url in urls:
+            entry = blobs.lookup(attachment_name(url))
+            text = texts.get(entry[0], default_engine(), max_chars) if entry else None
+            if text:
+                model.observe(ticker, text)
+                n += 1
+        if n:
+            log(f"{ticker}: learned from {n} filings, {len(model.learned(ticker))} boilerplate lines")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Learn per-company filing boilerplate")
+    parser.add_argument("--learn", action="store_true", help="learn from filings in the text cache")
+    parser.add_argument("--csv-dir", default="data/portfolio_stocks_gpt")
+    parser.add_argument("--reset", action="store_true", help="forget everything learned first")
+    args = parser.parse_args()
+    if args.reset and os.path.exists(BOILERPLATE_DB):
+        for path in glob.glob(BOILERPLATE_DB + "*"):
+            os.remove(path)
+    if args.learn:
+        from data_loader import EXTRACT_INPUT_CHARS  # pulls in streamlit; only needed here
+        learn_from_history(args.csv_dir, EXTRACT_INPUT_CHARS)
+
+
+if __name__ == "__main__":
+    main()
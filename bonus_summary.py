@@ -1,13 +1,10 @@
 # bonus_summary.py
 
 import requests
-from io import BytesIO
-from PyPDF2 import PdfReader
-from openai import OpenAI
 import os
 import streamlit as st
-from bs4 import BeautifulSoup
 import tempfile
+import time
 import whisper
 import traceback
 
@@ -15,49 +12,102 @@ from pydub import AudioSegment
 from pydub.utils import make_chunks
 import concurrent.futures # For parallel API calls
 
+from blob_cache import get_blob_cache
+from ingest_index import blob_name
+from openai_clients import get_openai_client, get_secret
+from llm_cache import llm_cached
+from pdf_text import extract_pdf_text, default_engine
+from html_text import extract_html_text
+from extract_pool import get_extraction_pool
+from text_cache import get_text_cache, sha256_of
+from chunk_select import select_chunks
+
 
 @st.cache_resource
 def load_whisper_model():
     return whisper.load_model("base")  # or "small", etc.
 
 HEADERS = {"User-Agent": "Mozilla/5.0"}
+MAX_INPUT_CHARS = 80000  # document text sent to GPT, picked by chunk_select
+MAX_EXTRACT_CHARS = 4 * MAX_INPUT_CHARS  # document text extracted to pick from
+TRANSCRIBE_TIMEOUT = 300  # seconds per Whisper chunk upload
+HTML_EXTRACTOR = "lxml-main"  # text cache key for extract_text_from_html output
 
 def download_url(url: str) -> tuple[str, bytes | None]:
     """
-    Downloads content from the URL and returns (content_type, content_bytes)
+    Downloads content from the URL and returns (content_type, content_bytes).
+    Served from the shared blob cache when the URL was fetched before, or
+    when the refresh already downloaded that BSE attachment.
     """
+    cache = get_blob_cache()
+    name = blob_name(url)
+    hit = cache.get(name)
+    if hit:
+        data, _, content_type = hit
+        return content_type or "", data
     try:
         response = requests.get(url, headers=HEADERS, timeout=10)
         response.raise_for_status()
-        return response.headers.get("Content-Type", ""), response.content
+        content_type = response.headers.get("Content-Type", "")
+        if "text/html" not in content_type:  # pages change; documents don't
+            cache.put(name, response.content, source_url=url, content_type=content_type)
+        return content_type, response.content
     except Exception as e:
         print(f"Failed to fetch content from {url}: {e}")
         return "", None
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+def extract_text_from_pdf(pdf_bytes: bytes, max_chars: int | None = MAX_EXTRACT_CHARS) -> str:
     try:
-        reader = PdfReader(BytesIO(pdf_bytes))
-        text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        return text.strip()
+        # stops parsing pages once max_chars are in, the rest would be cut anyway;
+        # runs in a worker process so a pathological PDF can't hang the app
+        return get_extraction_pool().run(extract_pdf_text, pdf_bytes, max_chars).strip()
     except Exception as e:
         print(f"Text extraction error (PDF): {e}")
         return ""
 
+def cached_text_for_url(url: str) -> str | None:
+    """
+    Extracted text of a document fetched from this URL before (by the app,
+    or by the refresh for a BSE attachment), without a network fetch: from
+    the text cache, else parsed from the cached blob. When the blob is gone,
+    a PDF's shorter refresh text (EXTRACT_INPUT_CHARS) is served rather than
+    nothing. None if not cached.
+    """
+    name = blob_name(url)
+    entry = get_blob_cache().lookup(name)
+    if not entry:
+        return None
+    sha, _, content_type = entry
+    if url.lower().endswith(".mp3"):
+        return get_text_cache().get(sha, "whisper-1")
+    if url.lower().endswith(".pdf") or "application/pdf" in (content_type or ""):
+        text = get_text_cache().get(sha, default_engine(), MAX_EXTRACT_CHARS)
+        if text is None:
+            hit = get_blob_cache().get(name)
+            if hit:
+                text = extract_text_cached(hit[0], default_engine(), extract_text_from_pdf)
+            else:
+                text = get_text_cache().get(sha, default_engine(), MAX_EXTRACT_CHARS, partial=True)
+        return text or None
+    return None
+
+def extract_text_cached(content: bytes, extractor: str, extract) -> str:
+    """extract(content), stored in / served from the text cache by content hash."""
+    limit = MAX_EXTRACT_CHARS if extractor != HTML_EXTRACTOR else None
+    return get_text_cache().get_or_extract(sha256_of(content), extractor, limit, lambda: extract(content))
+
 def extract_text_from_html(html_bytes: bytes) -> str:
     try:
-        soup = BeautifulSoup(html_bytes, "html.parser")
-        # Remove scripts and styles
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-        return soup.get_text(separator="\n", strip=True)
+        # lxml, main content only (no nav/ads/footers), see html_text.py
+        return extract_html_text(html_bytes)
     except Exception as e:
         print(f"Text extraction error (HTML): {e}")
         return ""
 
+@llm_cached("bonus_corp_filing", 1)  # bump when the prompt changes
 def call_gpt_for_summary_corp_filing(raw_input_text: str, gpt_model: str) -> dict | None:
     try:
-        my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-        client = OpenAI(api_key=my_api_key)
+        client = get_openai_client()
         user_prompt = f'''
 You're an expert in reading corporate filings on Indian stocks.
 
@@ -87,10 +137,10 @@ Filing text:
         return None
 
 
+@llm_cached("bonus_earnings_call", 1)  # bump when the prompt changes
 def call_gpt_for_summary_earnings_call(raw_input_text: str, gpt_model: str) -> dict | None:
     try:
-        my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-        client = OpenAI(api_key=my_api_key)
+        client = get_openai_client()
         user_prompt = f'''
 You're an expert in reading earnings conference call transcripts on Indian stocks.
 
@@ -124,10 +174,10 @@ Filing text:
         return None
 
 
+@llm_cached("bonus_research_report", 1)  # bump when the prompt changes
 def call_gpt_for_summary_research_report(raw_input_text: str, gpt_model: str) -> dict | None:
     try:
-        my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-        client = OpenAI(api_key=my_api_key)
+        client = get_openai_client()
         user_prompt = f'''
 You're an expert in reading research reports on Indian stocks.
 
@@ -157,10 +207,10 @@ Filing text:
         print(f"GPT API call failed: {e}")
         return None
 
+@llm_cached("bonus_news", 1)  # bump when the prompt changes
 def call_gpt_for_summary_news(raw_input_text: str, gpt_model: str) -> dict | None:
     try:
-        my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-        client = OpenAI(api_key=my_api_key)
+        client = get_openai_client()
         user_prompt = f'''
 You're an expert in reading news stories on Indian stocks.
 
@@ -189,10 +239,10 @@ Filing text:
         return None
 
 
+@llm_cached("bonus_general", 1)  # bump when the prompt changes
 def call_gpt_for_summary_general(raw_input_text: str, gpt_model: str) -> dict | None:
     try:
-        my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-        client = OpenAI(api_key=my_api_key)
+        client = get_openai_client()
         user_prompt = f'''
 You're an expert in reading text on Indian stocks and economy.
 
@@ -219,10 +269,10 @@ Filing text:
         return None
 
 
+@llm_cached("bonus_question", 1)  # bump when the prompt changes
 def answer_a_question(raw_input_text: str, question: str, gpt_model: str) -> dict | None:
     try:
-        my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-        client = OpenAI(api_key=my_api_key)
+        client = get_openai_client()
         user_prompt = f'''
 You're an expert in reading text on Indian stocks and economy.
 
@@ -234,7 +284,7 @@ Respond **only** in valid JSON format with exactly the following keys:
 1. "answer": Give an answer within 200-500 characters.
 
 Text input:
-{raw_input_text}
+{select_chunks(raw_input_text, MAX_INPUT_CHARS, query=question)}
 '''
         response = client.chat.completions.create(
             model=gpt_model,
@@ -422,12 +472,12 @@ def transcribe_audio_whisper1(mp3_path: str, max_retries: int = 1, initial_backo
     Transcribes an MP3 audio file using OpenAI Whisper and returns the transcript.
     Includes retry logic with exponential backoff for robustness.
     """
-    my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-    if not my_api_key:
+    if not get_secret("OPENAI_API_KEY"):
         st.error("OpenAI API key not found. Please set OPENAI_API_KEY in Streamlit secrets or environment variables.")
         return None
 
-    client = OpenAI(api_key=my_api_key)
+    # shared pooled client; audio uploads get a longer timeout than chat calls
+    client = get_openai_client().with_options(timeout=TRANSCRIBE_TIMEOUT)
 
     for attempt in range(max_retries + 1):
         try:
@@ -609,20 +659,30 @@ def summarize_filing(
     - file: Uploaded PDF file content (as bytes)
     - doc_type: Type of document for specialized GPT summary
 
+    Text already extracted from the same document (same URL or same bytes)
+    comes from the text cache, skipping download, parsing and transcription.
+
     Returns:
-    - Tuple of (summary, extracted_text) or (None, error_message)
+    - Tuple of (summary, extracted_text) or (None, error_message); extracted_text
+      is the whole extracted text, answer_a_question picks from it per question
     """
     
     if file:
-        text = extract_text_from_pdf(file)
+        text = extract_text_cached(file, default_engine(), extract_text_from_pdf)
         source_description = "uploaded file"
     
     elif url:
-        if url.lower().endswith(".mp3"):
+        text = cached_text_for_url(url)  # summarized before: no download, no parsing
+        if text:
+            source_description = url
+        elif url.lower().endswith(".mp3"):
             #text = transcribe_audio_from_url_local(url)
             text = transcribe_large_audio_whisper1(url, 5)
             if not text:
                 return None, "❌ Transcription failed."
+            entry = get_blob_cache().lookup(blob_name(url))  # the audio was cached by download_url
+            if entry:
+                get_text_cache().put(entry[0], "whisper-1", None, text)
             source_description = "transcribed audio file"
         else:
             content_type, content = download_url(url)
@@ -630,9 +690,9 @@ def summarize_filing(
                 return None, "❌ Failed to download content."
 
             if url.lower().endswith(".pdf") or "application/pdf" in content_type:
-                text = extract_text_from_pdf(content)
+                text = extract_text_cached(content, default_engine(), extract_text_from_pdf)
             elif "text/html" in content_type or url.lower().endswith(".html"):
-                text = extract_text_from_html(content)
+                text = extract_text_cached(content, HTML_EXTRACTOR, extract_text_from_html)
             else:
                 return None, "❌ Unsupported file format or could not determine file type."
 
@@ -643,7 +703,6 @@ def summarize_filing(
     if not text or not text.strip():
         return None, f"❌ No text could be extracted from the {source_description}."
 
-    text = text[:80000]  # truncate to stay within GPT token limits
 
     summarizers = {
         "earnings_call_transcript": call_gpt_for_summary_earnings_call,
@@ -654,7 +713,8 @@ def summarize_filing(
     }
 
     summarizer = summarizers.get(doc_type, call_gpt_for_summary_general)
-    gpt_response = summarizer(text, gpt_model)
+    # stay within GPT token limits with the most informative chunks, not just the head
+    gpt_response = summarizer(select_chunks(text, MAX_INPUT_CHARS), gpt_model)
 
     if not gpt_response:
         return None, "❌ Failed to get GPT summary."
@@ -0,0 +1,206 @@
+# bse_http.py
+# Pooled asyncio HTTP client for BSE (api.bseindia.com / www.bseindia.com).
+#
+# One httpx.AsyncClient runs on a background event loop and keeps TCP/TLS
+# connections alive between requests. Per-host semaphores bound how many
+# requests hit each BSE host at once, and every request goes through the
+# host's adaptive rate limiter (rate_limit.py) and the endpoint's retry
+# policy and circuit breaker (retry_policy.py). Synchronous callers (the
+# refresh worker threads, Streamlit) use get(); async code can await aget().
+
+import asyncio
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+import httpx
+
+from rate_limit import get_limiter
+from retry_policy import (RetryPolicy, CircuitOpenError, RETRY_STATUSES, get_endpoint,
+                          retry_after_seconds)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/115.0 Safari/537.36",
+    "Referer": "https://www.bseindia.com/"
+}
+
+# Max concurrent requests per host; unknown hosts get DEFAULT_PER_HOST
+PER_HOST_LIMITS = {
+    "api.bseindia.com": 6,
+    "www.bseindia.com": 8,
+}
+DEFAULT_PER_HOST = 4
+
+# Downloads larger than this stay on disk instead of in memory
+SPOOL_MAX_MEMORY = 2 * 1024 * 1024
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+class BseHttpClient:
+    def __init__(self, headers=None, max_connections=32, max_keepalive=16,
+                 connect_timeout=5.0, read_timeout=20.0, per_host_limits=None, retry=None):
+        self.headers = headers or DEFAULT_HEADERS
+        self.retry = retry or RetryPolicy()
+        self.per_host_limits = dict(PER_HOST_LIMITS, **(per_host_limits or {}))
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=30.0)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._host_slots = {}
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="bse-http", daemon=True)
+        self._thread.start()
+        self.client = self.run(self._make_client())
+
+    async def _make_client(self):
+        return httpx.AsyncClient(headers=self.headers, limits=self.limits,
+                                 timeout=self.timeout, follow_redirects=True)
+
+    def _slots(self, url):
+        host = urlparse(url).hostname or ""
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host_limits.get(host, DEFAULT_PER_HOST))
+        return self._host_slots[host]
+
+    async def _retrying(self, url, attempt):
+        """
+        Run `attempt` (a coroutine function doing one request) under the
+        endpoint's retry policy, budget and circuit breaker. Transport errors
+        and RETRY_STATUSES are retried; a response with a retryable status is
+        returned as-is once retries are exhausted. Raises CircuitOpenError
+        while the endpoint's breaker is open. Every attempt settles the
+        breaker, whatever it raised; ResponseTooLarge counts as healthy.
+        """
+        endpoint = get_endpoint(url)
+        endpoint.budget.deposit()
+        for n in range(self.retry.attempts):
+            if not endpoint.breaker.allow():
+                raise CircuitOpenError(f"{endpoint.key} is failing, paused for {endpoint.breaker.retry_in():.0f}s")
+            last_try = n + 1 >= self.retry.attempts
+            healthy = None  # no verdict (cancelled, undecodable body ...) just frees a half-open trial
+            try:
+                result = await attempt()
+            except ResponseTooLarge:
+                healthy = True  # BSE answered, the file is just too big
+                raise
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                response = getattr(e, "response", None) if isinstance(e, httpx.HTTPStatusError) else None
+                healthy = response is not None and response.status_code not in RETRY_STATUSES
+                if healthy:  # e.g. 404: BSE is up, the file isn't
+                    raise
+                if last_try or not endpoint.budget.try_spend():
+                    raise
+            else:
+                response = result if isinstance(result, httpx.Response) else None
+                healthy = response is None or response.status_code not in RETRY_STATUSES
+                if healthy or last_try or not endpoint.budget.try_spend():
+                    return result
+            finally:
+                endpoint.breaker.settle(healthy)  # always, or a half-open breaker would wait forever
+            await asyncio.sleep(self.retry.backoff(n, retry_after_seconds(response)))
+
+    async def aget(self, url, params=None, headers=None, timeout=None):
+        """GET on the shared pool, with retries. Returns httpx.Response (status not checked)."""
+        return await self._retrying(url, lambda: self._aget_once(url, params, headers, timeout))
+
+    async def _aget_once(self, url, params, headers, timeout):
+        kwargs = {"params": params, "headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        limiter = get_limiter(url)
+        async with self._slots(url):
+            await limiter.aacquire()
+            try:
+                resp = await self.client.get(url, **kwargs)
+            except httpx.TransportError:
+                limiter.record(None)
+                raise
+        limiter.record_response(resp)
+        return resp
+
+    async def adownload(self, url, max_bytes, headers=None, timeout=None, chunk_size=64 * 1024):
+        """
+        Stream a response body into a SpooledTemporaryFile (rewound, caller
+        closes it), with retries; an interrupted body is downloaded again.
+        Raises ResponseTooLarge past max_bytes and httpx.HTTPStatusError on non-2xx.
+        """
+        return await self._retrying(
+            url, lambda: self._adownload_once(url, max_bytes, headers, timeout, chunk_size))
+
+    async def _adownload_once(self, url, max_bytes, headers, timeout, chunk_size):
+        kwargs = {"headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        request = self.client.build_request("GET", url, **kwargs)
+        limiter = get_limiter(url)
+        async with self._slots(url):
+            await limiter.aacquire()
+            try:
+                resp = await self.client.send(request, stream=True)
+            except httpx.TransportError:
+                limiter.record(None)
+                raise
+            limiter.record_response(resp)
+            try:
+                resp.raise_for_status()
+                declared = int(resp.headers.get("Content-Length") or 0)
+                if max_bytes and declared > max_bytes:
+                    raise ResponseTooLarge(f"{url}: {declared} bytes > cap {max_bytes}")
+                spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+                size = 0
+                try:
+                    async for chunk in resp.aiter_bytes(chunk_size):
+                        size += len(chunk)
+                        if max_bytes and size > max_bytes:
+                            raise ResponseTooLarge(f"{url}: more than cap {max_bytes} bytes")
+                        spool.write(chunk)
+                except BaseException:
+                    spool.close()
+                    raise
+                spool.seek(0)
+                return spool, resp.headers.get("Content-Type", "")
+            finally:
+                await resp.aclose()
+
+    async def aget_many(self, urls_and_params, headers=None, timeout=None):
+        """Fetch [(url, params), ...] concurrently; exceptions are returned in place."""
+        return await asyncio.gather(
+            *(self.aget(url, params, headers=headers, timeout=timeout) for url, params in urls_and_params),
+            return_exceptions=True
+        )
+
+    def run(self, coro):
+        """Run a coroutine on the client loop from any thread and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        return self.run(self.aget(url, params=params, headers=headers, timeout=timeout))
+
+    def download(self, url, max_bytes, headers=None, timeout=None):
+        """Sync wrapper for adownload: returns (spooled_file, content_type)."""
+        return self.run(self.adownload(url, max_bytes, headers=headers, timeout=timeout))
+
+    def get_many(self, urls_and_params, headers=None, timeout=None):
+        return self.run(self.aget_many(urls_and_params, headers=headers, timeout=timeout))
+
+    def close(self):
+        self.run(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> BseHttpClient:
+    """Process-wide shared client (created on first use)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = BseHttpClient()
+        return _client
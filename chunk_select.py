@@ -0,0 +1,99 @@
+# chunk_select.py
+# Picks the most informative parts of a document for a GPT prompt budget,
+# instead of keeping only its head.
+#
+# The text is cut into chunks of about CHUNK_CHARS at line boundaries. Each
+# chunk is scored locally (no network, no model):
+#   - TF-IDF of its terms against the other chunks of the same document,
+#     so the chunks carrying the document's specific vocabulary win over
+#     repeated headers and notes;
+#   - financial keywords (revenue, EBITDA, crore, dividend, order, ...);
+#   - density of figures -- results filings are mostly tables of numbers;
+#   - words of the question, when there is one (Q&A);
+#   - a small bonus for the opening chunk, which names the subject.
+# The best chunks that fit the budget are returned in document order,
+# with GAP marking where text was left out.
+
+import math
+import re
+from collections import Counter
+
+CHUNK_CHARS = 600
+GAP = "\n[...]\n"
+
+KEYWORDS = {
+    "revenue", "revenues", "income", "profit", "profits", "loss", "ebitda", "ebit", "margin", "margins",
+    "eps", "pat", "pbt", "turnover", "sales", "crore", "crores", "cr", "lakh", "lakhs", "mn", "bn",
+    "dividend", "bonus", "split", "buyback", "order", "orders", "contract", "acquisition", "merger",
+    "guidance", "outlook", "growth", "yoy", "qoq", "quarter", "capex", "debt", "borrowings",
+    "rating", "approved", "resignation", "appointment", "allotment", "preferential", "qip",
+}
+TERM_RE = re.compile(r"[a-z]{2,}|\d[\d,]*(?:\.\d+)?%?")
+NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?%?")
+
+
+def split_chunks(text, size=CHUNK_CHARS):
+    """Chunks of about `size` chars, cut at line ends (over-long lines are split)."""
+    chunks, current, length = [], [], 0
+    for line in text.splitlines():
+        while len(line) > size:
+            if current:
+                chunks.append("\n".join(current))
+                current, length = [], 0
+            chunks.append(line[:size])
+            line = line[size:]
+        if length + len(line) > size and current:
+            chunks.append("\n".join(current))
+            current, length = [], 0
+        current.append(line)
+        length += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [c for c in chunks if c.strip()]
+
+
+def score_chunks(chunks, query=None):
+    terms = [Counter(TERM_RE.findall(c.lower())) for c in chunks]
+    df = Counter(t for tf in terms for t in tf)
+    n = len(chunks)
+    query_terms = set(TERM_RE.findall(query.lower())) - {"the", "is", "of", "and", "what", "how"} if query else set()
+    scores = []
+    for i, (chunk, tf) in enumerate(zip(chunks, terms)):
+        words = sum(tf.values()) or 1
+        tfidf = sum((1 + math.log(c)) * math.log((n + 1) / (df[t] + 1)) for t, c in tf.items()
+                    if not NUMBER_RE.fullmatch(t)) / math.sqrt(words)
+        keywords = sum(min(tf[k], 3) for k in KEYWORDS if k in tf)
+        figures = len(NUMBER_RE.findall(chunk)) / words
+        asked = sum(tf[t] for t in query_terms if t in tf)
+        score = tfidf + 0.5 * keywords + 4.0 * figures + 3.0 * asked
+        if i == 0:
+            score += 2.0
+        scores.append(score)
+    return scores
+
+
+def select_chunks(text, max_chars, query=None):
+    """
+    At most max_chars of `text`: the whole text if it fits, else the
+    highest-scoring chunks (see module docstring) in their original order.
+    `query` (a question) steers the choice towards chunks that mention it.
+    """
+    if not text or len(text) <= max_chars:
+        return text
+    chunks = split_chunks(text)
+    scores = score_chunks(chunks, query)
+    chosen, used = set(), 0
+    for i in sorted(range(len(chunks)), key=lambda i: -scores[i]):
+        cost = len(chunks[i]) + len(GAP)
+        if used + cost <= max_chars:
+            chosen.add(i)
+            used += cost
+    out, prev = [], -1
+    for i in sorted(chosen):
+        if out and i != prev + 1:
+            out.append(GAP)
+        elif out:
+            out.append("\n")
+        out.append(chunks[i])
+        prev = i
+    return "".join(out)[:max_chars]
@@ -2,14 +2,28 @@ import os
 import csv
 import pandas as pd
 import requests
-from io import BytesIO
 from datetime import datetime, timedelta
-from PyPDF2 import PdfReader
-import openai
-from openai import OpenAI
-import streamlit as st
 import json
 import base64
+import queue
+import threading
+import httpx
+from bse_http import get_client, ResponseTooLarge
+from openai_clients import get_openai_client, get_secret
+from llm_cache import llm_cached, llm_cache_stats
+from retry_policy import CircuitOpenError, endpoint_stats
+from filing_pipeline import Stage, Pipeline, format_metrics
+from pdf_text import extract_pdf_text, default_engine
+from extract_pool import ExtractionPool, get_extraction_pool
+from blob_cache import get_blob_cache
+from text_cache import get_text_cache
+from rate_limit import limiter_stats
+from ingest_index import get_index, WatermarkTracker, watermark_window_start
+from refresh_journal import open_job
+from run_lock import acquire_lock, release_lock
+from filing_triage import Triage, SKIP, HEADLINE, FULL, headline_text
+from boilerplate import strip_boilerplate, learn_boilerplate, boilerplate_stats
+from chunk_select import select_chunks
 
 # Suppress HF progress bars
 os.environ["TRANSFORMERS_NO_TQDM"] = "1"
@@ -75,7 +89,7 @@ tickers = [
 ]
 
 def upload_to_github(filepath, repo, path_in_repo, branch="main_sensex"):
-    token = st.secrets.get("GITHUB_TOKEN", os.getenv("GITHUB_TOKEN"))
+    token = get_secret("GITHUB_TOKEN")
     if not token:
         raise ValueError("GitHub token not found")
 
@@ -106,11 +120,13 @@ def upload_to_github(filepath, repo, path_in_repo, branch="main_sensex"):
 
 
 
+FILING_GPT_MODEL = "gpt-4.1-nano"  # also part of the llm_cache key below
+
+
+@llm_cached("filing_summary", 1, model=FILING_GPT_MODEL)  # bump when the prompt changes
 def call_gpt(raw_input_text: str) -> dict:
-    # Retrieve the API key
-    my_api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
     try:
-        client = OpenAI(api_key=my_api_key)
+        client = get_openai_client()  # shared, keeps connections alive between calls
         user_prompt = f'''
         You're an expert in reading corporate filings on Indian stocks.
         
@@ -125,7 +141,7 @@ def call_gpt(raw_input_text: str) -> dict:
         '''
         
         response = client.chat.completions.create(
-            model="gpt-4.1-nano",
+            model=FILING_GPT_MODEL,
             temperature=0,
             messages=[
                 {"role": "user", "content": user_prompt}
@@ -167,8 +183,8 @@ def update_filings_data_tmp(days=2, debug=False, status_callback=None, progress_
     
     # Loop through pages until no more data
     while True:
-        resp = requests.get("https://api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData/w", 
-                            params=params, headers=headers)
+        resp = get_client().get("https://api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData/w",
+                                params=params, headers=headers)
         
         if resp.status_code != 200:
             if debug and log_callback:
@@ -210,7 +226,7 @@ def update_filings_data_tmp(days=2, debug=False, status_callback=None, progress_
             if debug and log_callback:
                         log_callback(f"Attachment: {attachment_name} -> URL: {file_url}")
             
-            file_resp = requests.get(file_url, headers=headers)
+            file_resp = get_client().get(file_url, headers=headers)
             if file_resp.status_code == 200:
                 with open(file_path, "wb") as f:
                     #f.write(file_resp.content)
@@ -223,165 +239,669 @@ def update_filings_data_tmp(days=2, debug=False, status_callback=None, progress_
                         log_callback(f"Failed to download {attachment_name}: HTTP {file_resp.status_code}")
 
 
-def update_filings_data(days=2, debug=False, status_callback=None, progress_callback=None, log_callback=None):
-    """
-    Scrape and GPT process filings; append only new filings to existing ticker CSVs.
-    Returns total new records appended.
-    """
-    
-    BSE_API = "https://api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData/w"
-    #HEADERS = {"User-Agent":"Mozilla/5.0","Referer":"https://www.bseindia.com/"}
-    HEADERS = {
+BSE_API = "https://api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData/w"
+BSE_ATTACH_BASE = "https://www.bseindia.com/xml-data/corpfiling"
+#HEADERS = {"User-Agent":"Mozilla/5.0","Referer":"https://www.bseindia.com/"}
+HEADERS = {
     "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/115.0 Safari/537.36",
     "Referer": "https://www.bseindia.com/"
 }
+OUTPUT_DIR = "data/portfolio_stocks_gpt"
+MAX_PDF_BYTES = int(os.getenv("MAX_PDF_MB", "25")) * 1024 * 1024  # skip attachments bigger than this
+GPT_INPUT_CHARS = 4000  # only this much filing text is sent to call_gpt
+# extracted, boilerplate-stripped, then the best GPT_INPUT_CHARS picked by chunk_select
+EXTRACT_INPUT_CHARS = 5 * GPT_INPUT_CHARS
+MAX_EXTRACT_ATTEMPTS = 3  # runs a filing's extraction may fail (worker killed, parser error) before it is skipped
+INDEX_FILENAME = ".ingest_index.sqlite"  # processed attachments + per-ticker watermarks, see ingest_index.py
+JOBS_DIRNAME = ".jobs"  # checkpoint journals of refresh jobs, see refresh_journal.py
 
-    start = datetime.today() - timedelta(days=days)
-    end = datetime.today()
-    prev = start.strftime("%Y%m%d")
-    to = end.strftime("%Y%m%d")
-
-    total_new = 0
-    n = len(tickers)
-    if debug and log_callback:
-        log_callback(f"{n} tickers to process from {start} to {end}")
-    #print(n, start, end)
 
-    for i, tk in enumerate(tickers, 1):
-        if status_callback: status_callback(f"Processing {tk['name']} ({i}/{n})")
-        if progress_callback: progress_callback((i-1)/n)
-
-        #csv_path = os.path.join(default_output_dir, f"{tk['name']}.csv")
-        csv_path = f"data/portfolio_stocks_gpt/{tk['name']}.csv"
-        existing_urls = set()
-        if os.path.isfile(csv_path):
-            try:
-                df_exist = pd.read_csv(csv_path)
-                existing_urls = set(df_exist['url'].dropna().astype(str))
-            except Exception:
-                pass
-
-        payload = {"pageno":1,"strCat":"-1","strPrevDate":prev,
-                   "strScrip":tk['bse_code'],"strSearch":"P",
-                   "strToDate":to,"strType":"C","subcategory":""}
-        ann = []
-        while True:
+def fetch_pages(payload, timeout=10, debug=False, log_callback=None, label=""):
+    """
+    Every row of an announcement query. Page 1 carries the total row count
+    (Table1 ROWCNT), so the remaining pages are requested concurrently and
+    there is no trailing empty-page probe. Without ROWCNT it falls back to
+    paging until an empty page. Requests are retried by bse_http; a page
+    that still fails is logged and the other pages are kept.
+    Returns (rows, pages_requested, complete).
+    """
+    http = get_client()  # pooled keep-alive connections, see bse_http.py
+    try:
+        r = http.get(BSE_API, headers=HEADERS, params=payload, timeout=timeout)
+        r.raise_for_status()
+        first = r.json()
+    except Exception as e:
+        if debug and log_callback:
+            log_callback(f"Fetch error {label} page 1: {e}")
+        return [], 1, False
+    rows = list(first.get("Table", []))
+    try:
+        total = int((first.get("Table1") or [{}])[0].get("ROWCNT"))
+    except (TypeError, ValueError):
+        total = None
+
+    if total is None:  # no ROWCNT: page until an empty page
+        data, pageno = rows, 1
+        while data:
+            pageno += 1
             try:
-                r = requests.get(BSE_API, headers=HEADERS, params=payload, timeout=10)
+                r = http.get(BSE_API, headers=HEADERS, params=dict(payload, pageno=pageno), timeout=timeout)
                 r.raise_for_status()
+                data = r.json().get("Table", [])
             except Exception as e:
                 if debug and log_callback:
-                    log_callback(f"Fetch error {tk['name']}: {e}")
-                break
-            data = r.json().get("Table", [])
-            if not data: break
-            ann.extend(data)
-            payload["pageno"] += 1
+                    log_callback(f"Fetch error {label} page {pageno}: {e}")
+                return rows, pageno, False
+            rows.extend(data)
+        return rows, pageno, True
+
+    page_size = len(rows)
+    if not page_size or total <= page_size:
+        return rows, 1, True
+    n_pages = -(-total // page_size)
+    pending = [(BSE_API, dict(payload, pageno=p)) for p in range(2, n_pages + 1)]
+    complete = True
+    for p, resp in enumerate(http.get_many(pending, headers=HEADERS, timeout=timeout), 2):
+        try:
+            if isinstance(resp, Exception): raise resp
+            resp.raise_for_status()
+            rows.extend(resp.json().get("Table", []))
+        except Exception as e:
+            complete = False
+            if debug and log_callback:
+                log_callback(f"Fetch error {label} page {p}: {e}")
+    return rows, n_pages, complete
+
+
+def fetch_announcements(tk, prev, to, debug=False, log_callback=None):
+    """
+    Announcement rows for one ticker in [prev, to] -> (rows, complete).
+    complete is False if any page could not be fetched.
+    """
+    payload = {"pageno":1,"strCat":"-1","strPrevDate":prev,
+               "strScrip":tk['bse_code'],"strSearch":"P",
+               "strToDate":to,"strType":"C","subcategory":""}
+    ann, _, complete = fetch_pages(payload, timeout=10, debug=debug, log_callback=log_callback, label=tk['name'])
+    if debug and log_callback:
+        log_callback(f"{tk['name']}: {len(ann)} announcements" + ("" if complete else " (incomplete)"))
+    return ann, complete
+
+
+def sweep_announcements(prev, to, codes, debug=False, log_callback=None):
+    """
+    Market-wide sweep: page through every announcement on the exchange for
+    [prev, to] once (strScrip left empty) and keep only rows whose SCRIP_CD is
+    in `codes`. Request count scales with filing volume, not watchlist size.
+    Returns ({bse_code: [rows]} for every code in `codes`, complete).
+    """
+    wanted = {str(c) for c in codes}  # hashed set lookup per row
+    by_code = {c: [] for c in wanted}
+    payload = {"pageno":1,"strCat":"-1","strPrevDate":prev,
+               "strScrip":"","strSearch":"P",
+               "strToDate":to,"strType":"C","subcategory":""}
+    rows, pages, complete = fetch_pages(payload, timeout=20, debug=debug, log_callback=log_callback, label="sweep")
+    for row in rows:
+        code = str(row.get("SCRIP_CD", "")).strip()
+        if code in wanted:
+            by_code[code].append(row)
+    if debug and log_callback:
+        kept = sum(len(v) for v in by_code.values())
+        log_callback(f"Sweep: {len(rows)} announcements in {pages} pages, {kept} for watchlist")
+    return by_code, complete
+
+
+def index_path_for(output_dir):
+    return os.path.join(output_dir, INDEX_FILENAME)
+
+
+def jobs_dir_for(output_dir):
+    return os.path.join(output_dir, JOBS_DIRNAME)
+
+
+def is_processed(attach, index, debug=False, log_callback=None):
+    if index.has_attachment(attach):  # ✅ Skip if already processed (from either mirror)
         if debug and log_callback:
-            log_callback(f"{tk['name']}: {len(ann)} announcements")
+            log_callback(f"⏩ Skipping already processed attachment: {attach}")
+        return True
+    return False
+
+
+def triage_route(item, triage, debug=False, log_callback=None):
+    """SKIP / HEADLINE / FULL for an announcement (FULL when triage is off)."""
+    route = triage.route(item) if triage is not None else FULL
+    if route != FULL and debug and log_callback:
+        label = "⏩ Triage skip" if route == SKIP else "📰 Headline only"
+        log_callback(f"{label}: {item.get('HEADLINE') or item.get('NEWSSUB') or ''}")
+    return route
+
+
+def live_attachment_url(attach):
+    return f"{BSE_ATTACH_BASE}/AttachLive/{attach}"
+
+
+def download_attachment(attach, debug=False, log_callback=None):
+    """
+    Try the local blob cache, then AttachLive, then AttachHis.
+    Downloads are streamed to a spooled temp file and straight into the
+    blob cache, never held whole in memory. Returns (pdf_file_path, url),
+    or (None, None) when it could not be fetched this time. Raises
+    ResponseTooLarge past MAX_PDF_BYTES: that won't change on a retry, so
+    the caller skips the filing for good.
+    """
+    cache = get_blob_cache()
+    hit = cache.get_path(attach)
+    if hit:
+        return hit[0], hit[1]
+
+    http = get_client()
+    for path in [
+        live_attachment_url(attach),
+        f"{BSE_ATTACH_BASE}/AttachHis/{attach}"
+    ]:
+        try:
+            spool, content_type = http.download(path, MAX_PDF_BYTES, headers=HEADERS, timeout=10)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                continue  # not in this mirror, try the next one
+            if debug and log_callback:
+                log_callback(f"Download error {attach}: {e}")
+            return None, None
+        except (httpx.HTTPError, httpx.InvalidURL, CircuitOpenError) as e:
+            # transport errors were already retried by bse_http; bad bodies, redirect
+            # loops and bad URLs skip just this filing, which stays unprocessed for the next run
+            if debug and log_callback:
+                log_callback(f"Download error {attach}: {e}")
+            return None, None
+        with spool:
+            cache.put(attach, spool, source_url=path, content_type=content_type)
+        hit = cache.get_path(attach)
+        return (hit[0], path) if hit else (None, None)
+    return None, None
+
+
+def cached_attachment_text(attach):
+    """(text, url) of an attachment extracted before, from the text cache, or (None, None)."""
+    entry = get_blob_cache().lookup(attach)
+    text = get_text_cache().get(entry[0], default_engine(), EXTRACT_INPUT_CHARS) if entry else None
+    return (text, entry[1]) if text else (None, None)
+
+
+def extract_attachment_text(attach, pdf, pool=None):
+    """
+    Text of a downloaded attachment, up to EXTRACT_INPUT_CHARS: from the text cache when this
+    document (by content hash) was extracted before, else parsed in an
+    extraction worker and cached.
+    """
+    pool = pool or get_extraction_pool()
+    entry = get_blob_cache().lookup(attach)
+    extract = lambda: pool.run(extract_pdf_text, pdf, EXTRACT_INPUT_CHARS)
+    if not entry:
+        return extract()
+    return get_text_cache().get_or_extract(entry[0], default_engine(), EXTRACT_INPUT_CHARS, extract)
+
+
+def normalize_filing_text(tk, text, debug=False, log_callback=None):
+    """Extracted filing text minus the company's boilerplate (see boilerplate.py)."""
+    text, before, after = strip_boilerplate(tk['name'], text)
+    if debug and log_callback:
+        log_callback(f"✂️ Boilerplate {tk['name']}: -{before - after} tokens ({before} -> {after})")
+    return text
+
+
+def filing_date(item):
+    raw = item.get("DissemDT","")
+    try: d = raw.split("T")[0]; return datetime.fromisoformat(d).strftime("%Y-%m-%d")
+    except: return datetime.today().strftime("%Y-%m-%d")
+
+
+def summarize_text(text, debug=False, log_callback=None):
+    """GPT summary of extracted filing text -> (summary, sentiment, category) or None."""
+    input_text = select_chunks(text, GPT_INPUT_CHARS)  # most informative chunks, not just the head
+    raw_input_text = f"Text:\n{input_text}"
+    gpt_response = call_gpt(raw_input_text)
+    #if debug and log_callback:
+    #    log_callback(f"Input: {raw_input_text}\nGPT raw: {gpt_response}")
+
+    if not gpt_response:
+        return None
+
+    try:
+        # Parse the JSON string from GPT
+        parsed = json.loads(gpt_response)
+
+        summary = parsed.get('summary', '')
+        sentiment = parsed.get('sentiment', '')
+        category = parsed.get('category', '')
+
+        if debug and log_callback:
+            log_callback(f"📝 Summary GPT: {summary}")
+            log_callback(f"📈 Sentiment GPT: {sentiment}")
+            log_callback(f"🏷️ Category GPT: {category}")
+        return summary, sentiment, category
+
+    except (ValueError, json.JSONDecodeError) as e:
+        if debug and log_callback:
+            log_callback(f"⚠️ JSON parse error: {e}")
+        return None
+
+
+def make_record(tk, item, pdf_url, result):
+    summary, sentiment, category = result
+    return {
+        'ticker': tk['name'],
+        'code': tk['bse_code'],
+        'date': filing_date(item),
+        'summary_gpt': summary,
+        'sentiment_gpt': sentiment,
+        'category_gpt': category,
+        'url': pdf_url
+    }
+
+
+def append_records(csv_path, new_records, index=None):
+    write_header = not os.path.isfile(csv_path)
+    with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=new_records[0].keys())
+        if write_header: writer.writeheader()
+        writer.writerows(new_records)
+    if index is not None:
+        index.add_records(new_records)
+        index.note_csv_written(csv_path)
+
+
+def upload_ticker_csv(tk, csv_path, debug=False, log_callback=None):
+    # ✅ Upload to GitHub
+    try:
+        upload_to_github(
+            filepath=csv_path,
+            repo="imviveksaini/sensex-filings-app",
+            path_in_repo=f"data/portfolio_stocks_gpt/{tk['name']}.csv",
+            branch="main_sensex"
+        )
+    except Exception as e:
+        if debug and log_callback:
+            log_callback(f"GitHub upload failed for {tk['name']}: {e}")
 
-        new_records = []
-        for item in ann:
-            attach = item.get("ATTACHMENTNAME","").strip()
-            if not attach: continue
-
-            pdf = None; pdf_url = None
-            for path in [
-                f"https://www.bseindia.com/xml-data/corpfiling/AttachLive/{attach}",
-                f"https://www.bseindia.com/xml-data/corpfiling/AttachHis/{attach}"
-            ]:
-                if path in existing_urls:  # ✅ Skip if already processed
-                    if debug and log_callback:
-                        log_callback(f"⏩ Skipping already processed URL: {path}")
-                    pdf_url = None
-                    break  # skip rest of loop
-        
-                try:
-                    tmp = requests.get(path, headers=HEADERS, timeout=10)
-                    tmp.raise_for_status()
-                    pdf = tmp.content
-                    pdf_url = path
-                    break
-                except:
-                    continue
-        
-            if not pdf_url:  # either already processed or download failed
-                continue
 
-            raw = item.get("DissemDT","")
-            try: d = raw.split("T")[0]; date = datetime.fromisoformat(d).strftime("%Y-%m-%d")
-            except: date = datetime.today().strftime("%Y-%m-%d")
+def ticker_announcements(tk, prev, to, index, swept=None, use_watermarks=True, debug=False, log_callback=None,
+                         journal=None):
+    """
+    Announcement rows with an attachment for one ticker, fetched from the
+    day its watermark is scanned through, else from prev (or taken from a
+    market sweep). With a
+    journal, rows fetched by an interrupted run of the same job are reused.
+    Returns (rows, complete); incomplete fetches are not journaled.
+    """
+    if journal is not None and tk['name'] in journal.fetched:
+        return journal.fetched[tk['name']], True
+    complete = True
+    if swept is not None:
+        ann = swept.get(tk['bse_code'], [])
+    else:
+        start = watermark_window_start(index, tk['name'], prev) if use_watermarks else prev
+        if debug and log_callback and start != prev:
+            log_callback(f"{tk['name']}: scanning from watermark {start}")
+        ann, complete = fetch_announcements(tk, start, to, debug=debug, log_callback=log_callback)
+    ann = [item for item in ann if item.get("ATTACHMENTNAME","").strip()]
+    if journal is not None and complete:
+        journal.record_fetched(tk['name'], ann)
+    return ann, complete
+
+
+def process_ticker(tk, prev, to, debug=False, log_callback=None, output_dir=OUTPUT_DIR, upload=True,
+                   announcements=None, use_watermarks=True, journal=None, triage=None):
+    """
+    Serial path: fetch, download, GPT-summarize and persist the filings of
+    a single ticker. Returns number of new records appended.
+    `announcements` skips the per-scrip fetch (rows from sweep_announcements).
+    `journal` (refresh_journal.RefreshJournal) checkpoints fetched rows and
+    GPT results so a restarted job does not redo them.
+    `triage` (filing_triage.Triage) skips routine filings and summarizes
+    some from their headline without downloading the PDF.
+    """
+    #csv_path = os.path.join(default_output_dir, f"{tk['name']}.csv")
+    csv_path = os.path.join(output_dir, f"{tk['name']}.csv")
+    index = get_index(index_path_for(output_dir))
+    index.sync_csv(tk['name'], csv_path)
+    tracker = WatermarkTracker(index, to)
+    swept = None if announcements is None else {tk['bse_code']: announcements}
+    ann, complete = ticker_announcements(tk, prev, to, index, swept, use_watermarks, debug, log_callback, journal)
+    tracker.begin(tk['name'], ann, complete)
+
+    new_records = []
+    handled = []
+    learned_texts = []
+    for item in ann:
+        attach = item.get("ATTACHMENTNAME","").strip()
+        if is_processed(attach, index, debug, log_callback):
+            tracker.done(tk['name'], item)
+            continue
+
+        record = journal.summary_for(tk['name'], attach) if journal is not None else None
+        if record:  # summarized before the restart, just persist it
+            new_records.append(record)
+            handled.append(item)
+            continue
 
-            text = ""
+        route = triage_route(item, triage, debug, log_callback)
+        if route == SKIP:
+            tracker.done(tk['name'], item)
+            continue
+        if route == HEADLINE:
+            pdf_url, text = live_attachment_url(attach), headline_text(item)
+        else:
+            text, pdf_url = cached_attachment_text(attach)
+        if route != HEADLINE and not text:
             try:
-                for p in PdfReader(BytesIO(pdf)).pages:
-                    t = p.extract_text() or ""; text += t + "\n"
-            except Exception as e:
+                pdf, pdf_url = download_attachment(attach, debug, log_callback)
+            except ResponseTooLarge as e:
                 if debug and log_callback:
-                    log_callback(f"Extract error: {e}")
+                    log_callback(f"⏩ Skipping oversized attachment: {e}")
+                tracker.skipped(tk['name'], item, "oversized")
                 continue
-            if not text.strip(): continue
-
-            input_text = text[:4000]
-            raw_input_text = f"Text:\n{input_text}"
-            gpt_response = call_gpt(raw_input_text)
-            #if debug and log_callback:
-            #    log_callback(f"Input: {raw_input_text}\nGPT raw: {gpt_response}")
-            
-            if not gpt_response:
+            if not pdf_url:  # download failed
+                tracker.failed(tk['name'], item)
                 continue
-            
+
             try:
-                # Parse the JSON string from GPT
-                parsed = json.loads(gpt_response)
-            
-                summary = parsed.get('summary', '')
-                sentiment = parsed.get('sentiment', '')
-                category = parsed.get('category', '')
-            
-                if debug and log_callback:
-                    log_callback(f"📝 Summary GPT: {summary}")
-                    log_callback(f"📈 Sentiment GPT: {sentiment}")
-                    log_callback(f"🏷️ Category GPT: {category}")
-            
-                new_records.append({
-                    'ticker': tk['name'],
-                    'code': tk['bse_code'],
-                    'date': date,
-                    'summary_gpt': summary,
-                    'sentiment_gpt': sentiment,
-                    'category_gpt': category,
-                    'url': pdf_url
-                })
-            
-            except (ValueError, json.JSONDecodeError) as e:
+                # worker process with time/memory limits, see extract_pool.py
+                text = extract_attachment_text(attach, pdf)
+            except Exception as e:
                 if debug and log_callback:
-                    log_callback(f"⚠️ JSON parse error: {e}")
+                    log_callback(f"Extract error: {e}")
+                tracker.failed(tk['name'], item, f"extract: {e}", give_up_after=MAX_EXTRACT_ATTEMPTS)
+                continue
+            if not text.strip():  # scanned PDF without a text layer: no retry will change that
+                tracker.skipped(tk['name'], item, "no text")
                 continue
+        raw_text = text
+        if route != HEADLINE:
+            text = normalize_filing_text(tk, text, debug, log_callback)
+
+        result = summarize_text(text, debug=debug, log_callback=log_callback)
+        if not result:
+            tracker.failed(tk['name'], item)
+            continue
+        record = make_record(tk, item, pdf_url, result)
+        if journal is not None:
+            journal.record_summarized(tk['name'], attach, record)
+        new_records.append(record)
+        handled.append(item)
+        if route != HEADLINE:
+            learned_texts.append(raw_text)
+
+    if new_records:
+        append_records(csv_path, new_records, index)
+        for raw_text in learned_texts:  # only filings actually persisted count towards boilerplate
+            learn_boilerplate(tk['name'], raw_text)
+        if upload:
+            upload_ticker_csv(tk, csv_path, debug, log_callback)
+    for item in handled:
+        tracker.done(tk['name'], item)
+
+    return len(new_records)
+
+
+def run_pipeline(prev, to, debug=False, status_callback=None, progress_callback=None, log_callback=None,
+                 fetch_workers=4, download_workers=4, extract_workers=None, gpt_workers=4,
+                 output_dir=OUTPUT_DIR, upload=True, metrics_callback=None, swept=None,
+                 use_watermarks=True, journal=None, triage=None, ticker_list=None):
+    """
+    Staged refresh: fetch -> download -> extract -> summarize -> persist.
+    Stages are connected by bounded queues, so PDF downloads, text
+    extraction (worker processes) and GPT calls overlap. Callbacks run on
+    the calling thread; metrics_callback gets the per-stage metrics list
+    (queue depth, items/s, utilization) on every poll.
+    `swept` ({bse_code: rows} from sweep_announcements) replaces the per-scrip fetch.
+    Filings already summarized in `journal` go straight to persist;
+    headline-only filings (see `triage`) skip download and extract.
+    `ticker_list` restricts the run to a subset of `tickers`.
+    Returns total new records appended.
+    """
+    universe = ticker_list if ticker_list is not None else tickers
+    logs = queue.Queue()
+    log = logs.put if (debug and log_callback) else None
+    n = len(universe)
+    tickers_fetched = [0]
+    touched = {}   # csv_path -> ticker, uploaded once at the end
+    lock = threading.Lock()
+    index = get_index(index_path_for(output_dir))
+    tracker = WatermarkTracker(index, to)
+
+    def failed(job, error=None, give_up_after=None):
+        tracker.failed(job["tk"]["name"], job["item"], error, give_up_after)
+        return []
+
+    def skipped(job, reason):
+        tracker.skipped(job["tk"]["name"], job["item"], reason)
+        return []
+
+    def fetch(tk):
+        csv_path = os.path.join(output_dir, f"{tk['name']}.csv")
+        index.sync_csv(tk['name'], csv_path)
+        ann, complete = ticker_announcements(tk, prev, to, index, swept, use_watermarks, debug, log, journal)
+        tracker.begin(tk['name'], ann, complete)
+        out = []
+        for item in ann:
+            attach = item.get("ATTACHMENTNAME","").strip()
+            if is_processed(attach, index, debug, log):
+                tracker.done(tk['name'], item)
+                continue
+            job = {"tk": tk, "item": item, "attach": attach, "csv_path": csv_path}
+            record = journal.summary_for(tk['name'], attach) if journal is not None else None
+            if record:
+                job["record"] = record  # skips download/extract/summarize
+            else:
+                route = triage_route(item, triage, debug, log)
+                if route == SKIP:
+                    tracker.done(tk['name'], item)
+                    continue
+                job["route"] = route
+                if route == HEADLINE:
+                    job["url"], job["text"] = live_attachment_url(attach), headline_text(item)
+                else:
+                    text, url = cached_attachment_text(attach)
+                    if text:  # extracted before: skips download/extract
+                        job["url"], job["text"] = url, text
+            out.append(job)
+        with lock:
+            tickers_fetched[0] += 1
+        return out
+
+    def download(job):
+        if "record" in job or "text" in job: return [job]
+        try:
+            job["pdf"], job["url"] = download_attachment(job["attach"], debug, log)
+        except ResponseTooLarge as e:
+            if log: log(f"⏩ Skipping oversized attachment: {e}")
+            return skipped(job, "oversized")
+        return [job] if job["url"] else failed(job)
+
+    def extract(job):
+        if "record" in job or "text" in job: return [job]
+        try:
+            job["text"] = extract_attachment_text(job["attach"], job.pop("pdf"), extract_pool)
+        except Exception as e:
+            if log: log(f"Extract error: {e}")
+            return failed(job, f"extract: {e}", MAX_EXTRACT_ATTEMPTS)
+        return [job] if job["text"].strip() else skipped(job, "no text")
+
+    def summarize(job):
+        if "record" in job: return [job]
+        text = job.pop("text")
+        if job.get("route") != HEADLINE:
+            job["raw_text"] = text  # learned from once persisted
+            text = normalize_filing_text(job["tk"], text, debug, log)
+        result = summarize_text(text, debug=debug, log_callback=log)
+        if not result:
+            return failed(job)
+        job["record"] = make_record(job["tk"], job["item"], job["url"], result)
+        if journal is not None:
+            journal.record_summarized(job["tk"]["name"], job["attach"], job["record"])
+        return [job]
+
+    def persist(job):
+        append_records(job["csv_path"], [job["record"]], index)
+        if "raw_text" in job:
+            learn_boilerplate(job["tk"]["name"], job.pop("raw_text"))
+        touched[job["csv_path"]] = job["tk"]
+        tracker.done(job["tk"]["name"], job["item"])
+        return [job]
+
+    def on_error(stage, job, e):
+        if log: log(f"{stage.name} error: {e}")
+        if "item" in job:
+            failed(job)
+
+    stages = [
+        Stage("fetch", fetch, workers=fetch_workers),
+        Stage("download", download, workers=download_workers),
+        Stage("extract", extract, workers=extract_workers or os.cpu_count() or 2),
+        Stage("summarize", summarize, workers=gpt_workers),
+        Stage("persist", persist, workers=1),  # single writer per CSV
+    ]
+    pipeline = Pipeline(stages, on_error=on_error)
+
+    def poll(p):
+        while not logs.empty():
+            log_callback(logs.get())
+        metrics = p.metrics()
+        if metrics_callback: metrics_callback(metrics)
+        discovered = metrics[0]["emitted"]
+        finished = sum(m["done"] - m["emitted"] for m in metrics[1:4]) + metrics[4]["done"]
+        if status_callback:
+            status_callback(f"Fetched {tickers_fetched[0]}/{n} tickers, saved {metrics[4]['done']} filings")
+        if progress_callback:
+            progress_callback(min(0.99, (tickers_fetched[0] / n) * (finished / discovered if discovered else 0)))
+
+    # extraction workers are killed and replaced past the per-document time/RSS limits
+    with ExtractionPool(workers=stages[2].workers) as extract_pool:
+        pipeline.start(universe)
+        pipeline.join(on_poll=poll)
+    poll(pipeline)
 
+    if debug and log_callback:
+        log_callback(f"Stage metrics: {format_metrics(pipeline.metrics())}")
+        log_callback(f"Extraction pool: {extract_pool.stats()}")
+        log_callback(f"Bottleneck stage: {pipeline.bottleneck()}")
 
-        if new_records:
-            write_header = not os.path.isfile(csv_path)
-            with open(csv_path, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=new_records[0].keys())
-                if write_header: writer.writeheader()
-                writer.writerows(new_records)
-            total_new += len(new_records)
+    if upload:
+        for csv_path, tk in touched.items():
+            upload_ticker_csv(tk, csv_path, debug, log_callback)
+    return stages[4].done
 
-            # ✅ Upload to GitHub
-            try:
-                upload_to_github(
-                    filepath=csv_path,
-                    repo="imviveksaini/sensex-filings-app",
-                    path_in_repo=f"data/portfolio_stocks_gpt/{tk['name']}.csv",
-                    branch="main_sensex"
-                )
-            except Exception as e:
-                if debug and log_callback:
-                    log_callback(f"GitHub upload failed for {tk['name']}: {e}")
 
-    if progress_callback: progress_callback(1.0)
-    if status_callback: status_callback(f"Done: {total_new} new filings.")
+def update_filings_data(days=2, debug=False, status_callback=None, progress_callback=None, log_callback=None,
+                        max_workers=1, max_downloads=None, max_gpt_calls=None, extract_workers=None,
+                        output_dir=OUTPUT_DIR, upload=True, metrics_callback=None, sweep=False,
+                        use_watermarks=True, resume=True, triage=True, ticker_list=None):
+    """
+    Scrape and GPT process filings; append only new filings to existing ticker CSVs.
+    Returns total new records appended, or None when another refresh holds
+    output_dir's lock (run_lock.py) -- the daemon, a shard or another
+    session's refresh button.
+
+    max_workers > 1 switches to the staged pipeline (see run_pipeline) with
+    max_workers ticker fetchers, max_downloads concurrent PDF downloads,
+    extract_workers extraction processes and max_gpt_calls concurrent GPT
+    calls. max_workers=1 keeps the original one-ticker-at-a-time loop.
+
+    sweep=True pulls the whole exchange's announcements for the window once
+    and filters locally by bse_code, instead of paging each scrip separately.
+
+    use_watermarks=True queries each ticker only from the day its
+    announcements were last scanned through (see ingest_index.py); `days`
+    is then just the window for tickers without a watermark yet. Set False
+    to backfill: every ticker is re-scanned over the last `days` days, and
+    filings already in the index are still not downloaded again.
+
+    Every run is a job checkpointed in <output_dir>/.jobs (refresh_journal.py).
+    resume=True picks up the last unfinished job with its original window,
+    reusing its fetched announcements and GPT results; resume=False always
+    starts a fresh job.
+
+    triage=True routes filings on CATEGORYNAME/SUBCATNAME/HEADLINE before
+    downloading (filing_triage.py): routine notices are skipped and some are
+    summarized from the headline alone. False sends everything through GPT.
+
+    ticker_list limits the refresh to those tickers (default: all of
+    `tickers`); shard_refresh.py uses it to split the universe.
+    """
+    lock = acquire_lock(output_dir)
+    if not lock:
+        if log_callback:
+            log_callback(f"⏩ Another refresh is running on {output_dir}, skipping")
+        if status_callback: status_callback("Another refresh is already running.")
+        return None
+    try:
+        start = datetime.today() - timedelta(days=days)
+        end = datetime.today()
+        prev = start.strftime("%Y%m%d")
+        to = end.strftime("%Y%m%d")
+
+        params = {"prev": prev, "to": to, "sweep": sweep, "use_watermarks": use_watermarks}
+        journal = open_job(jobs_dir_for(output_dir), params, resume=resume)
+        if journal.params != params:
+            prev, to = journal.params["prev"], journal.params["to"]
+            if log_callback:
+                log_callback(f"♻️ Resuming job {journal.job_id} ({prev}-{to}): "
+                             f"{len(journal.fetched)} tickers fetched, {len(journal.summarized)} filings summarized")
+
+        universe = ticker_list if ticker_list is not None else tickers
+        total_new = 0
+        n = len(universe)
+        triage = Triage() if triage else None
+        if debug and log_callback:
+            log_callback(f"{n} tickers to process from {prev} to {to}")
+        #print(n, start, end)
+
+        swept = None
+        if sweep and not all(tk['name'] in journal.fetched for tk in universe):
+            if status_callback: status_callback("Sweeping exchange announcements")
+            sweep_from = prev
+            if use_watermarks:
+                index = get_index(index_path_for(output_dir))
+                sweep_from = min(watermark_window_start(index, tk['name'], prev) for tk in universe)
+            swept, complete = sweep_announcements(sweep_from, to, [tk['bse_code'] for tk in universe],
+                                                  debug=debug, log_callback=log_callback)
+            if not complete:
+                if log_callback:
+                    log_callback("⚠️ Sweep incomplete, fetching tickers one by one instead")
+                swept = None
+
+        try:
+            if max_workers <= 1:
+                for i, tk in enumerate(universe, 1):
+                    if status_callback: status_callback(f"Processing {tk['name']} ({i}/{n})")
+                    if progress_callback: progress_callback((i-1)/n)
+                    total_new += process_ticker(tk, prev, to, debug=debug, log_callback=log_callback,
+                                                output_dir=output_dir, upload=upload, use_watermarks=use_watermarks,
+                                                announcements=swept.get(tk['bse_code'], []) if swept is not None else None,
+                                                journal=journal, triage=triage)
+            else:
+                total_new = run_pipeline(prev, to, debug=debug, status_callback=status_callback,
+                                         progress_callback=progress_callback, log_callback=log_callback,
+                                         fetch_workers=max_workers,
+                                         download_workers=max_downloads or max_workers,
+                                         extract_workers=extract_workers,
+                                         gpt_workers=max_gpt_calls or max_workers,
+                                         output_dir=output_dir, upload=upload,
+                                         metrics_callback=metrics_callback, swept=swept,
+                                         use_watermarks=use_watermarks, journal=journal, triage=triage,
+                                         ticker_list=universe)
+            journal.finish(total_new)
+        finally:
+            journal.close()  # unfinished journals are resumed by the next call
+
+        if debug and log_callback:
+            log_callback(f"Rate limiters: {limiter_stats()}")
+            log_callback(f"Endpoints: {endpoint_stats()}")
+            log_callback(f"Boilerplate: {boilerplate_stats()}")
+            log_callback(f"LLM cache: {llm_cache_stats()}")
+        if progress_callback: progress_callback(1.0)
+        if status_callback: status_callback(f"Done: {total_new} new filings.")
+    finally:
+        release_lock(lock)
     return total_new
 
 
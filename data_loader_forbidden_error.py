@@ -2,14 +2,15 @@ import os
 import csv
 import pandas as pd
 import requests
-from io import BytesIO
 from datetime import datetime, timedelta
-from PyPDF2 import PdfReader
+from pdf_text import extract_pdf_text
 import openai
 from openai import OpenAI
 import streamlit as st
 import json
 import base64
+from ingest_index import get_index
+from rate_limit import get_limiter
 
 # Suppress HF progress bars
 os.environ["TRANSFORMERS_NO_TQDM"] = "1"
@@ -230,6 +231,8 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
     """
     
     BSE_API = "https://api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData/w"
+    api_limiter = get_limiter(BSE_API)
+    pdf_limiter = get_limiter("www.bseindia.com")
     #HEADERS = {"User-Agent":"Mozilla/5.0","Referer":"https://www.bseindia.com/"}
     HEADERS = {
     "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/115.0 Safari/537.36",
@@ -253,13 +256,8 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
 
         #csv_path = os.path.join(default_output_dir, f"{tk['name']}.csv")
         csv_path = f"data/portfolio_stocks_gpt/{tk['name']}.csv"
-        existing_urls = set()
-        if os.path.isfile(csv_path):
-            try:
-                df_exist = pd.read_csv(csv_path)
-                existing_urls = set(df_exist['url'].dropna().astype(str))
-            except Exception:
-                pass
+        index = get_index()  # shared attachment-id index, see ingest_index.py
+        index.sync_csv(tk['name'], csv_path)
 
         payload = {"pageno":1,"strCat":"-1","strPrevDate":prev,
                    "strScrip":tk['bse_code'],"strSearch":"P",
@@ -267,7 +265,9 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
         ann = []
         while True:
             try:
+                api_limiter.acquire()
                 r = requests.get(BSE_API, headers=HEADERS, params=payload, timeout=10)
+                api_limiter.record_response(r)
                 r.raise_for_status()
             except Exception as e:
                 if debug and log_callback:
@@ -284,20 +284,20 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
         for item in ann:
             attach = item.get("ATTACHMENTNAME","").strip()
             if not attach: continue
+            if index.has_attachment(attach):  # ✅ Skip if already processed (from either mirror)
+                if debug and log_callback:
+                    log_callback(f"⏩ Skipping already processed attachment: {attach}")
+                continue
 
             pdf = None; pdf_url = None
             for path in [
                 f"https://www.bseindia.com/xml-data/corpfiling/AttachLive/{attach}",
                 f"https://www.bseindia.com/xml-data/corpfiling/AttachHis/{attach}"
             ]:
-                if path in existing_urls:  # ✅ Skip if already processed
-                    if debug and log_callback:
-                        log_callback(f"⏩ Skipping already processed URL: {path}")
-                    pdf_url = None
-                    break  # skip rest of loop
-        
                 try:
+                    pdf_limiter.acquire()
                     tmp = requests.get(path, headers=HEADERS, timeout=10)
+                    pdf_limiter.record_response(tmp)
                     tmp.raise_for_status()
                     pdf = tmp.content
                     pdf_url = path
@@ -312,10 +312,8 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
             try: d = raw.split("T")[0]; date = datetime.fromisoformat(d).strftime("%Y-%m-%d")
             except: date = datetime.today().strftime("%Y-%m-%d")
 
-            text = ""
             try:
-                for p in PdfReader(BytesIO(pdf)).pages:
-                    t = p.extract_text() or ""; text += t + "\n"
+                text = extract_pdf_text(pdf, max_chars=4000)
             except Exception as e:
                 if debug and log_callback:
                     log_callback(f"Extract error: {e}")
@@ -366,6 +364,8 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
                 writer = csv.DictWriter(f, fieldnames=new_records[0].keys())
                 if write_header: writer.writeheader()
                 writer.writerows(new_records)
+            index.add_records(new_records)
+            index.note_csv_written(csv_path)
             total_new += len(new_records)
 
             # ✅ Upload to GitHub
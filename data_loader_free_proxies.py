@@ -2,15 +2,15 @@ import os
 import csv
 import pandas as pd
 import requests
-from io import BytesIO
 from datetime import datetime, timedelta
-from PyPDF2 import PdfReader
+from pdf_text import extract_pdf_text
 import openai
 from openai import OpenAI
 import streamlit as st
 import json
 import base64
-import time
+from ingest_index import get_index
+from rate_limit import get_limiter
 import random
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -233,14 +233,11 @@ def update_filings_data_tmp(days=2, debug=False, status_callback=None, progress_
 
 import random
 import requests
-import time
 from datetime import datetime, timedelta
 import os
 import pandas as pd
 import csv
 import json
-from io import BytesIO
-from PyPDF2 import PdfReader
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from urllib.parse import urlencode
@@ -317,6 +314,8 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
         tickers = [...]  # Your default ticker list (replace with actual list)
 
     BSE_API = "https://api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData/w"
+    api_limiter = get_limiter(BSE_API)
+    pdf_limiter = get_limiter("www.bseindia.com")
     USER_AGENTS = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
@@ -383,20 +382,15 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
         if progress_callback: progress_callback((i-1)/n)
 
         csv_path = f"data/portfolio_stocks_gpt/{tk['name']}.csv"
-        existing_urls = set()
-        if os.path.isfile(csv_path):
-            try:
-                df_exist = pd.read_csv(csv_path)
-                existing_urls = set(df_exist['url'].dropna().astype(str))
-            except Exception:
-                pass
+        index = get_index()  # shared attachment-id index, see ingest_index.py
+        index.sync_csv(tk['name'], csv_path)
 
         payload = {"pageno":1,"strCat":"-1","strPrevDate":prev,
                    "strScrip":tk['bse_code'],"strSearch":"P",
                    "strToDate":to,"strType":"C","subcategory":""}
         ann = []
         while True:
-            time.sleep(random.uniform(1, 3))  # Reduced delay
+            api_limiter.acquire()  # adaptive per-host pacing, see rate_limit.py
 
             proxy_index = 0
             for _ in range(max_proxy_tries):
@@ -413,6 +407,7 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
                         proxies={"http": proxy_url, "https": proxy_url} if proxy_url else None,
                         timeout=30  # Increased timeout
                     )
+                    api_limiter.record_response(response)
                     response.raise_for_status()
                     data = response.json().get("Table", [])
                     if not data: break
@@ -442,19 +437,17 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
         for item in ann:
             attach = item.get("ATTACHMENTNAME","").strip()
             if not attach: continue
+            if index.has_attachment(attach):  # ✅ Skip if already processed (from either mirror)
+                if debug and log_callback:
+                    log_callback(f"⏩ Skipping already processed attachment: {attach}")
+                continue
 
             pdf = None; pdf_url = None
             for path in [
                 f"https://www.bseindia.com/xml-data/corpfiling/AttachLive/{attach}",
                 f"https://www.bseindia.com/xml-data/corpfiling/AttachHis/{attach}"
             ]:
-                if path in existing_urls:
-                    if debug and log_callback:
-                        log_callback(f"⏩ Skipping already processed URL: {path}")
-                    pdf_url = None
-                    break
-
-                time.sleep(random.uniform(1, 3))  # Reduced delay
+                pdf_limiter.acquire()  # adaptive per-host pacing, see rate_limit.py
 
                 proxy_index = 0
                 for _ in range(max_proxy_tries):
@@ -468,6 +461,7 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
                             proxies={"http": proxy_url, "https": proxy_url} if proxy_url else None,
                             timeout=30  # Increased timeout
                         )
+                        pdf_limiter.record_response(tmp)
                         tmp.raise_for_status()
                         pdf = tmp.content
                         pdf_url = path
@@ -492,10 +486,8 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
             try: d = raw.split("T")[0]; date = datetime.fromisoformat(d).strftime("%Y-%m-%d")
             except: date = datetime.today().strftime("%Y-%m-%d")
 
-            text = ""
             try:
-                for p in PdfReader(BytesIO(pdf)).pages:
-                    t = p.extract_text() or ""; text += t + "\n"
+                text = extract_pdf_text(pdf, max_chars=4000)
             except Exception as e:
                 if debug and log_callback:
                     log_callback(f"Extract error: {e}")
@@ -541,6 +533,8 @@ def update_filings_data(days=2, debug=False, status_callback=None, progress_call
                 writer = csv.DictWriter(f, fieldnames=new_records[0].keys())
                 if write_header: writer.writeheader()
                 writer.writerows(new_records)
+            index.add_records(new_records)
+            index.note_csv_written(csv_path)
             total_new += len(new_records)
 
             try:
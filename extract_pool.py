@@ -0,0 +1,193 @@
+# extract_pool.py
+# Supervised worker processes for PDF text extraction.
+#
+# PyPDF2 is pure Python: a pathological PDF can spin for minutes or balloon
+# memory, and in-process it would also hold the GIL over the Streamlit
+# script / refresh threads. Each ExtractionPool worker is a spawned process
+# fed over a pipe; the calling thread watches it while waiting and kills it
+# when the document exceeds the wall-clock or RSS budget (or it crashes).
+# A fresh worker replaces it on the next call. Workers are also recycled
+# after max_tasks documents.
+#
+# ProcessPoolExecutor can't do this: a timed-out future keeps its worker
+# busy, and killing one worker breaks the whole executor.
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT_S", "60"))  # seconds per document
+EXTRACT_MAX_RSS = int(os.getenv("EXTRACT_MAX_RSS_MB", "1024")) * 1024 * 1024  # per worker
+MAX_TASKS_PER_WORKER = 200
+POLL_INTERVAL = 0.05
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+class ExtractionMemoryError(ExtractionError):
+    pass
+
+
+def _worker_main(conn):
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args, kwargs = task
+        try:
+            result = (True, fn(*args, **kwargs))
+        except Exception as e:
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception:  # unpicklable exception
+            conn.send((False, ExtractionError(repr(result[1]))))
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0  # no /proc (macOS, Windows): RSS limit not enforced
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child,), daemon=True, name="pdf-extract")
+        self.proc.start()
+        child.close()
+        self.tasks = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.proc.join(timeout=1)
+        self.kill()
+
+    def kill(self):
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join(timeout=5)
+        self.conn.close()
+
+
+class ExtractionPool:
+    def __init__(self, workers=None, timeout=EXTRACT_TIMEOUT, max_rss=EXTRACT_MAX_RSS,
+                 max_tasks=MAX_TASKS_PER_WORKER):
+        self.workers = workers or os.cpu_count() or 2
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.max_tasks = max_tasks
+        self._ctx = multiprocessing.get_context("spawn")  # don't fork the HTTP loop thread
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.done = 0
+        self.timeouts = 0
+        self.memory_kills = 0
+        self.crashes = 0
+
+    def _checkout(self):
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return _Worker(self._ctx)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, worker, healthy):
+        if healthy and worker.tasks < self.max_tasks and not self._closed:
+            with self._lock:
+                self._idle.append(worker)
+        elif healthy:
+            worker.stop()
+        else:
+            worker.kill()
+        self._slots.release()
+
+    def run(self, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs) in a worker process (fn and arguments must be
+        picklable). Raises ExtractionTimeout / ExtractionMemoryError when a
+        limit is hit, ExtractionError if the worker died, else whatever fn raised.
+        """
+        worker = self._checkout()
+        healthy = False
+        try:
+            worker.conn.send((fn, args, kwargs))
+            worker.tasks += 1
+            deadline = time.monotonic() + self.timeout
+            while not worker.conn.poll(POLL_INTERVAL):
+                if not worker.proc.is_alive():
+                    self.crashes += 1
+                    raise ExtractionError(f"extraction worker died (exit code {worker.proc.exitcode})")
+                if time.monotonic() > deadline:
+                    self.timeouts += 1
+                    raise ExtractionTimeout(f"extraction took over {self.timeout:.0f}s, worker killed")
+                if self.max_rss and _rss_bytes(worker.proc.pid) > self.max_rss:
+                    self.memory_kills += 1
+                    raise ExtractionMemoryError(
+                        f"extraction used over {self.max_rss // 2**20} MB, worker killed")
+            try:
+                ok, value = worker.conn.recv()
+            except (EOFError, OSError):
+                self.crashes += 1
+                worker.proc.join(timeout=1)
+                raise ExtractionError(f"extraction worker died (exit code {worker.proc.exitcode})")
+            healthy = True
+        finally:
+            self._checkin(worker, healthy)
+        self.done += 1
+        if ok:
+            return value
+        raise value
+
+    def stats(self):
+        return {"workers": self.workers, "done": self.done, "timeouts": self.timeouts,
+                "memory_kills": self.memory_kills, "crashes": self.crashes}
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """Process-wide pool (one worker per core, started on demand)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractionPool()
+            atexit.register(_pool.close)
+        return _pool
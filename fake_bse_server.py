@@ -0,0 +1,259 @@
+# fake_bse_server.py
+# Local stand-in for the BSE announcement API and attachment mirrors, plus
+# an OpenAI-style chat-completions endpoint, used to benchmark the refresh
+# without hitting bseindia.com or OpenAI.
+
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PAGE_SIZE = 50
+
+
+def make_pdf(text: str) -> bytes:
+    """
+    Build a minimal single-page PDF containing `text` (one line per \\n).
+    Good enough for PyPDF2 to extract the text back.
+    """
+    lines = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").split("\n")
+    stream = "BT /F1 10 Tf 40 800 Td 12 TL\n" + "\n".join(f"({l}) Tj T*" for l in lines) + "\nET"
+    stream = zlib.compress(stream.encode("latin-1", "replace"))
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+
+# (CATEGORYNAME, SUBCATNAME, HEADLINE) cycled through each scrip's filings,
+# a rough mix of substantive and routine BSE announcements
+KINDS = [
+    ("Company Update", "General", "Announcement {k} for {code}"),
+    ("Company Update", "Closure of Trading Window", "Closure of Trading Window {k} for {code}"),
+    ("Result", "Financial Results", "Financial results {k} for {code}"),
+    ("Company Update", "Analyst / Investor Meet - Intimation", "Analyst / Investor Meet {k} for {code}"),
+]
+
+
+class TokenBucket:
+    """Server-side request rate limit; take() is False when the client should get a 429."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class FakeBse:
+    """
+    In-memory announcement book: `filings_per_scrip` announcements for every
+    scrip code in `scrip_codes`, dated today, cycling through KINDS.
+
+    error_rate: share of API/PDF requests answered with a 503.
+    rate_limit: requests/s per endpoint (API, PDFs) before 429 + Retry-After.
+    his_share: share of attachments only on the AttachHis mirror.
+    gpt_latency: seconds per fake chat completion (POST /v1/chat/completions).
+    """
+
+    def __init__(self, scrip_codes, filings_per_scrip=3, api_latency=0.0, pdf_latency=0.0,
+                 error_rate=0.0, rate_limit=None, his_share=0.0, gpt_latency=0.0, seed=0):
+        self.api_latency = api_latency
+        self.pdf_latency = pdf_latency
+        self.gpt_latency = gpt_latency
+        self.error_rate = error_rate
+        self.buckets = {"api": TokenBucket(rate_limit), "pdf": TokenBucket(rate_limit)} if rate_limit else {}
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.announcements = {}
+        self.pdfs = {}
+        self.his_only = set()
+        self.listed_at = {}  # ATTACHMENTNAME -> time.monotonic() it was first served in a listing
+        self.api_requests = 0
+        self.pdf_requests = 0
+        self.gpt_requests = 0
+        self.gpt_prompt_chars = 0
+        self.errors = 0
+        self.throttled = 0
+        today = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")
+        for code in scrip_codes:
+            rows = []
+            for k in range(filings_per_scrip):
+                name = f"{code}-{k:04d}.pdf"
+                category, subcategory, headline = KINDS[k % len(KINDS)]
+                headline = headline.format(k=k, code=code)
+                rows.append({
+                    "NEWSID": f"{code}{k:04d}",
+                    "SCRIP_CD": int(code),
+                    "NEWSSUB": headline,
+                    "HEADLINE": headline,
+                    "CATEGORYNAME": category,
+                    "SUBCATNAME": subcategory,
+                    "DissemDT": today,
+                    "ATTACHMENTNAME": name,
+                })
+                self.pdfs[name] = make_pdf(f"Scrip {code}\nFiling number {k}\nBoard meeting outcome and results.")
+                if self.rng.random() < his_share:
+                    self.his_only.add(name)
+            self.announcements[str(code)] = rows
+
+    def page(self, params):
+        code = params.get("strScrip", "")
+        rows = self.announcements.get(code, []) if code else [
+            r for rs in self.announcements.values() for r in rs
+        ]
+        pageno = int(params.get("pageno", 1))
+        chunk = rows[(pageno - 1) * PAGE_SIZE: pageno * PAGE_SIZE]
+        now = time.monotonic()
+        for r in chunk:
+            self.listed_at.setdefault(r["ATTACHMENTNAME"], now)
+        return {"Table": chunk, "Table1": [{"ROWCNT": len(rows)}]}
+
+    def pdf(self, path):
+        """PDF bytes for an AttachLive/AttachHis path, or None (404)."""
+        name = path.rsplit("/", 1)[-1]
+        if "/AttachLive/" in path and name in self.his_only:
+            return None
+        return self.pdfs.get(name)
+
+    def fault(self, kind):
+        """(status, headers) to fail this request with, or None to serve it."""
+        bucket = self.buckets.get(kind)
+        if bucket and not bucket.take():
+            self.throttled += 1
+            return 429, {"Retry-After": "1"}
+        with self.rng_lock:
+            failed = self.rng.random() < self.error_rate
+        if failed:
+            self.errors += 1
+            return 503, {}
+        return None
+
+    def chat_completion(self, request):
+        self.gpt_requests += 1
+        prompt = "".join(str(m.get("content", "")) for m in request.get("messages", []))
+        self.gpt_prompt_chars += len(prompt)
+        time.sleep(self.gpt_latency)
+        content = json.dumps({"summary": "Not important. Benchmark filing.", "sentiment": 0, "category": "benchmark"})
+        return {
+            "id": f"chatcmpl-fake-{self.gpt_requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _fault(self, kind):
+            fault = fake.fault(kind)
+            if fault:
+                self._send(fault[0], b"unavailable", "text/plain", fault[1])
+            return fault is not None
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.endswith("/AnnSubCategoryGetData/w"):
+                fake.api_requests += 1
+                time.sleep(fake.api_latency)
+                if self._fault("api"):
+                    return
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                self._send(200, json.dumps(fake.page(params)).encode(), "application/json")
+            elif "/AttachLive/" in url.path or "/AttachHis/" in url.path:
+                fake.pdf_requests += 1
+                time.sleep(fake.pdf_latency)
+                if self._fault("pdf"):
+                    return
+                pdf = fake.pdf(url.path)
+                if pdf is None:
+                    self._send(404, b"not found", "text/plain")
+                else:
+                    self._send(200, pdf, "application/pdf")
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if urlparse(self.path).path.endswith("/chat/completions"):
+                reply = fake.chat_completion(json.loads(body or b"{}"))
+                self._send(200, json.dumps(reply).encode(), "application/json")
+            else:
+                self._send(404, b"not found", "text/plain")
+
+    return Handler
+
+
+def start_server(fake, host="127.0.0.1", port=0):
+    """
+    Serve `fake` on a background thread. Returns (server, base_url).
+    Point data_loader at it with:
+        data_loader.BSE_API = f"{base_url}/BseIndiaAPI/api/AnnSubCategoryGetData/w"
+        data_loader.BSE_ATTACH_BASE = f"{base_url}/xml-data/corpfiling"
+    and the OpenAI client with OPENAI_BASE_URL={base_url}/v1.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    from data_loader import tickers
+    fake = FakeBse([tk["bse_code"] for tk in tickers])
+    server, base_url = start_server(fake, port=8765)
+    print(f"Fake BSE serving on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
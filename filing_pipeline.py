@@ -0,0 +1,145 @@
+# filing_pipeline.py
+# Small thread-based staged pipeline: each stage has its own worker threads
+# and a bounded inbox queue, so network, CPU and LLM work overlap while
+# back-pressure keeps memory bounded.
+
+import queue
+import threading
+import time
+
+_DONE = object()  # end-of-stream marker passed between stages
+
+
+class Stage:
+    """
+    One pipeline stage. `func(item)` returns a list of outputs for the next
+    stage ([] drops the item). Exceptions are counted and the item dropped.
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=64):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.inbox = queue.Queue(maxsize=maxsize)
+        self.next = None
+        self.on_error = None
+
+        self._lock = threading.Lock()
+        self._finished_workers = 0
+        self.in_flight = 0
+        self.done = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.started = None
+        self.stopped = None
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            with self._lock:
+                self.in_flight += 1
+                if self.started is None:
+                    self.started = time.perf_counter()
+            t0 = time.perf_counter()
+            try:
+                outputs = self.func(item) or []
+            except Exception as e:
+                outputs = []
+                with self._lock:
+                    self.errors += 1
+                if self.on_error:
+                    self.on_error(self, item, e)
+            with self._lock:
+                self.in_flight -= 1
+                self.done += 1
+                self.emitted += len(outputs)
+                self.busy_s += time.perf_counter() - t0
+            if self.next is not None:
+                for out in outputs:
+                    self.next.inbox.put(out)
+
+        # Last worker out closes the downstream stage
+        with self._lock:
+            self._finished_workers += 1
+            last = self._finished_workers == self.workers
+            if last:
+                self.stopped = time.perf_counter()
+        if last and self.next is not None:
+            for _ in range(self.next.workers):
+                self.next.inbox.put(_DONE)
+
+    def metrics(self):
+        with self._lock:
+            elapsed = ((self.stopped or time.perf_counter()) - self.started) if self.started else 0.0
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "queue": self.inbox.qsize(),
+                "in_flight": self.in_flight,
+                "done": self.done,
+                "emitted": self.emitted,
+                "errors": self.errors,
+                "items_per_s": self.done / elapsed if elapsed > 0 else 0.0,
+                # Share of worker time spent busy; ~1.0 with a full inbox = bottleneck
+                "utilization": self.busy_s / (elapsed * self.workers) if elapsed > 0 else 0.0,
+            }
+
+
+class Pipeline:
+    def __init__(self, stages, on_error=None):
+        self.stages = stages
+        for a, b in zip(stages, stages[1:]):
+            a.next = b
+        for s in stages:
+            s.on_error = on_error
+        self._threads = []
+
+    def start(self, items):
+        for s in self.stages:
+            for k in range(s.workers):
+                t = threading.Thread(target=s._run, name=f"{s.name}-{k}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+        first = self.stages[0]
+
+        def feed():
+            for item in items:
+                first.inbox.put(item)
+            for _ in range(first.workers):
+                first.inbox.put(_DONE)
+
+        feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+        feeder.start()
+        self._threads.append(feeder)
+
+    def is_alive(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def join(self, poll_interval=0.5, on_poll=None):
+        """Wait for all stages to drain, calling on_poll(self) from this thread."""
+        while self.is_alive():
+            time.sleep(poll_interval)
+            if on_poll:
+                on_poll(self)
+        for t in self._threads:
+            t.join()
+
+    def metrics(self):
+        return [s.metrics() for s in self.stages]
+
+    def bottleneck(self):
+        """Stage with the highest utilization (ties broken by queue depth)."""
+        m = self.metrics()
+        return max(m, key=lambda x: (x["utilization"], x["queue"]))["stage"] if m else None
+
+
+def format_metrics(metrics):
+    return " | ".join(
+        f"{m['stage']}: q={m['queue']} run={m['in_flight']} done={m['done']} "
+        f"{m['items_per_s']:.1f}/s util={m['utilization']:.0%}"
+        for m in metrics
+    )
@@ -0,0 +1,75 @@
+# filing_triage.py
+# Route BSE announcements on their metadata before anything is downloaded.
+#
+# Every announcement row carries CATEGORYNAME, SUBCATNAME and HEADLINE.
+# Routine notices (demat certificates, trading-window closures, newspaper
+# copies, lost certificates) are skipped outright; a second tier is
+# summarized by GPT from the headline alone, without fetching the PDF; the
+# rest takes the full PDF + GPT path.
+#
+# Rules are checked in order, first match wins, default is FULL. Each rule
+# has an "action" and any of "category" / "subcategory" / "headline"
+# (case-insensitive regexes, all given ones must match). Set TRIAGE_RULES_FILE
+# to a JSON list of such rules to replace DEFAULT_RULES.
+
+import json
+import os
+import re
+
+SKIP = "skip"
+HEADLINE = "headline"
+FULL = "full"
+ACTIONS = (SKIP, HEADLINE, FULL)
+
+DEFAULT_RULES = [
+    # Results, transcripts and orders always get the full document
+    {"action": FULL, "category": r"^Result"},
+    {"action": FULL, "subcategory": r"Financial Results|Earnings Call Transcript|Investor Presentation|Award of Order|Receipt of Order"},
+    # Routine compliance notices
+    {"action": SKIP, "subcategory": r"74 ?\(5\)|Trading Window|Newspaper Publication|Loss of (Share )?Certificate|Duplicate (Share )?Certificate|Reg\.? ?39 ?\(3\)"},
+    {"action": SKIP, "headline": r"dematerial(i[sz])?ation|74 ?\(5\)|closure of trading window|trading window closure|newspaper (publication|advertisement)|loss of (share )?certificate|issue of duplicate"},
+    # Informative enough from the headline
+    {"action": HEADLINE, "subcategory": r"Analyst ?/ ?Investor Meet|Credit Rating|ESOP|ESOS|ESPS|Allotment|Change in (Management|Directorate)|Book Closure|Record Date|Secretarial Compliance|Shareholders? Meeting|Postal Ballot|Audio Recording"},
+    {"action": HEADLINE, "headline": r"analyst ?/ ?investor meet|investor meet|schedule of (analyst|investor)|audio recording|credit rating|allotment of|postal ballot|scrutini[sz]er'?s? report|voting results"},
+]
+
+
+def load_rules(path=None):
+    """Rules from a JSON file (path or TRIAGE_RULES_FILE), else DEFAULT_RULES."""
+    path = path or os.getenv("TRIAGE_RULES_FILE")
+    if not path:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    for rule in rules:
+        if rule.get("action") not in ACTIONS:
+            raise ValueError(f"Bad triage action in {path}: {rule}")
+    return rules
+
+
+def _compile(rules):
+    fields = {"category": "CATEGORYNAME", "subcategory": "SUBCATNAME", "headline": "HEADLINE"}
+    compiled = []
+    for rule in rules:
+        checks = [(fields[k], re.compile(rule[k], re.I)) for k in fields if rule.get(k)]
+        compiled.append((rule["action"], checks))
+    return compiled
+
+
+class Triage:
+    def __init__(self, rules=None):
+        self._rules = _compile(rules if rules is not None else load_rules())
+
+    def route(self, item):
+        """SKIP, HEADLINE or FULL for an announcement row."""
+        for action, checks in self._rules:
+            if checks and all(rx.search(str(item.get(field) or "")) for field, rx in checks):
+                return action
+        return FULL
+
+
+def headline_text(item):
+    """What GPT sees for a HEADLINE-routed filing instead of the PDF text."""
+    return (f"Category: {item.get('CATEGORYNAME', '')} / {item.get('SUBCATNAME', '')}\n"
+            f"Headline: {item.get('HEADLINE') or ''}\n"
+            f"Subject: {item.get('NEWSSUB') or ''}")
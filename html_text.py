@@ -0,0 +1,120 @@
+# html_text.py
+# HTML text extraction for bonus summaries (news stories, research notes,
+# company pages pasted as URLs).
+#
+# extract_html_text parses with lxml (libxml2, C) instead of BeautifulSoup's
+# pure-Python html.parser, drops scripts/styles and page chrome (nav, header,
+# footer, aside, forms, and elements whose class/id says ad, menu, share,
+# related, comments, cookie ...), then keeps only the main content block:
+# <article>/<main>/articleBody when the page marks it, else the container
+# whose paragraphs carry the most text that isn't links. Falls back to the
+# whole page when no block stands out. soup_text is the previous
+# BeautifulSoup extractor, kept for bench_html_extract.py.
+
+import re
+
+import lxml.html
+from lxml import etree
+
+DROP_TAGS = ("script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "embed",
+             "nav", "footer", "aside", "form", "button", "select", "input", "textarea")
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "br", "tr", "table", "td", "th",
+              "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dd", "dt", "figcaption"}
+CHROME_RE = re.compile(
+    r"(^|[\s_-])(ad|ads|advert\w*|banner|sponsor\w*|promo\w*|nav|navbar|navigation|menu|breadcrumbs?|"
+    r"footer|header|masthead|sidebar|widget|share|sharing|social|related|recommend\w*|trending|"
+    r"comments?|disqus|cookie\w*|consent|gdpr|subscribe|newsletter|signup|login|popup|modal|outbrain|taboola)"
+    r"($|[\s_-])", re.I)
+MAIN_XPATH = "//article | //main | //*[@itemprop='articleBody'] | //*[@role='main']"
+MIN_MAIN_SHARE = 0.25  # a main-content candidate must hold this share of the page's paragraph text
+
+
+def _drop_chrome(root):
+    etree.strip_elements(root, etree.Comment, *DROP_TAGS, with_tail=False)
+    doomed = []
+    for el in root.iter():
+        if not isinstance(el.tag, str) or el.tag in ("html", "body"):
+            continue
+        marks = f"{el.get('class', '')} {el.get('id', '')}"
+        if marks.strip() and CHROME_RE.search(marks) and not _holds_content(el):
+            doomed.append(el)
+    for el in doomed:
+        if el.getparent() is not None:
+            el.drop_tree()  # keeps the tail text, which belongs to the parent
+
+
+def _holds_content(el):
+    """Wrappers like <div class="page has-sidebar"> can hold the article itself."""
+    if el.tag in ("article", "main") or el.xpath(".//article | .//main | .//*[@itemprop='articleBody']"):
+        return True
+    return sum(len(p.text_content()) for p in el.iter("p")) > 1000
+
+
+def _link_text_len(el):
+    return sum(len(a.text_content()) for a in el.iter("a"))
+
+
+def _main_block(root):
+    """The element holding the main content, or root when nothing stands out."""
+    scores, total = {}, 0
+    for p in root.iter("p", "pre", "blockquote"):
+        size = len(p.text_content().strip())
+        if size < 25:
+            continue
+        size -= _link_text_len(p)
+        total += max(size, 0)
+        parent = p.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + size
+        grand = parent.getparent()
+        if grand is not None:
+            scores[grand] = scores.get(grand, 0) + size / 2
+
+    marked = [(len(el.text_content().strip()), el) for el in root.xpath(MAIN_XPATH)]
+    if marked:
+        size, el = max(marked, key=lambda m: m[0])
+        if size >= 200:
+            return el
+    if scores and total:
+        best = max(scores, key=scores.get)
+        if scores[best] >= MIN_MAIN_SHARE * total:
+            return best
+    return root
+
+
+def _block_text(el):
+    for node in el.iter():
+        if isinstance(node.tag, str) and node.tag in BLOCK_TAGS:
+            node.tail = "\n" + (node.tail or "")
+            if node.tag == "br":
+                continue
+            node.text = "\n" + (node.text or "")
+    lines = (re.sub(r"\s+", " ", line).strip() for line in el.text_content().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def extract_html_text(html_bytes, main_content=True) -> str:
+    """Readable text of an HTML page, one block per line; main content only unless main_content=False."""
+    if not html_bytes or not html_bytes.strip():
+        return ""
+    root = lxml.html.fromstring(html_bytes)
+    _drop_chrome(root)
+    if not main_content:
+        return _block_text(root)
+    main = _main_block(root)
+    titles = root.xpath("//h1")
+    title = re.sub(r"\s+", " ", titles[0].text_content()).strip() if titles else ""
+    text = _block_text(main)
+    if title and main is not root and title not in text:
+        text = f"{title}\n{text}"  # headline sits above the article body on most news sites
+    return text
+
+
+def soup_text(html_bytes) -> str:
+    """The previous extractor: BeautifulSoup html.parser, scripts and styles removed."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_bytes, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
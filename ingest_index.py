@@ -0,0 +1,279 @@
+# ingest_index.py
+# Local ingestion state for the filings refresh:
+#   - processed: every filing already summarized into a ticker CSV, keyed on
+#     its BSE ATTACHMENTNAME so a PDF is recognised whichever mirror
+#     (AttachLive / AttachHis) served it. The duplicate check is an indexed
+#     lookup, done before any download, and shared by every data_loader variant
+#     Filings that can never be summarized (oversized, no text layer, or
+#     extraction failing every time) are recorded here too, with a reason
+#   - watermarks: the day each ticker's announcements have been scanned
+#     through, so each refresh only asks BSE for announcements from there
+#     forward. It moves to the end of the window after every complete fetch
+#     with nothing left to retry, quiet tickers included
+#
+# It's a derived cache: missing or stale tickers are (re)seeded from their
+# CSV whenever the CSV on disk changes behind our back.
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+INDEX_PATH = "data/portfolio_stocks_gpt/.ingest_index.sqlite"
+SCHEMA_VERSION = 3
+BSE_ATTACH_URL_RE = re.compile(r"https?://(www\.)?bseindia\.com/xml-data/corpfiling/Attach(Live|His)/", re.I)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    attachment  TEXT PRIMARY KEY,
+    ticker      TEXT NOT NULL,
+    url         TEXT,
+    dissem_dt   TEXT,
+    added_at    TEXT,
+    skipped     TEXT            -- why it was given up on; NULL when it is in the CSV
+);
+CREATE INDEX IF NOT EXISTS processed_ticker ON processed(ticker);
+CREATE TABLE IF NOT EXISTS failures (
+    attachment  TEXT PRIMARY KEY,
+    ticker      TEXT NOT NULL,
+    attempts    INTEGER NOT NULL,
+    last_error  TEXT,
+    updated_at  TEXT
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    ticker          TEXT PRIMARY KEY,
+    scanned_through TEXT NOT NULL,  -- YYYYMMDD
+    updated_at      TEXT
+);
+CREATE TABLE IF NOT EXISTS seeded (
+    csv_path    TEXT PRIMARY KEY,
+    signature   TEXT
+);
+"""
+
+
+def attachment_name(url):
+    """AttachLive/AttachHis URL (or bare name) -> ATTACHMENTNAME."""
+    return str(url).strip().rsplit("/", 1)[-1]
+
+
+def blob_name(url):
+    """
+    Blob cache name for a downloaded URL: BSE attachment URLs go under their
+    ATTACHMENTNAME, as download_attachment stores them, whichever mirror
+    they point at; any other URL is its own name.
+    """
+    if BSE_ATTACH_URL_RE.match(str(url).strip()):
+        return attachment_name(url)
+    return url
+
+
+def _csv_signature(csv_path):
+    try:
+        st = os.stat(csv_path)
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        return None
+
+
+class IngestIndex:
+    def __init__(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # Derived data only: rebuild rather than migrate
+            with self.db:
+                for table in ("processed", "failures", "watermarks", "seeded"):
+                    self.db.execute(f"DROP TABLE IF EXISTS {table}")
+                self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        with self.db:
+            self.db.executescript(SCHEMA)
+
+    # --- seeding from the CSVs ---
+
+    def sync_csv(self, ticker, csv_path):
+        """Load attachments from csv_path into the index if the file changed since last sync."""
+        sig = _csv_signature(csv_path)
+        if sig is None:
+            return
+        with self._lock:
+            row = self.db.execute("SELECT signature FROM seeded WHERE csv_path=?", (csv_path,)).fetchone()
+        if row and row[0] == sig:
+            return
+        try:
+            urls = pd.read_csv(csv_path, usecols=["url"])["url"].dropna().astype(str)
+        except Exception:
+            urls = []
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO processed(attachment, ticker, url, dissem_dt, added_at) VALUES (?, ?, ?, NULL, ?)",
+                [(attachment_name(u), ticker, u, now) for u in urls]
+            )
+            self.db.execute("INSERT OR REPLACE INTO seeded(csv_path, signature) VALUES (?, ?)", (csv_path, sig))
+
+    def note_csv_written(self, csv_path):
+        """Call after appending to a CSV ourselves, so it isn't re-parsed next time."""
+        sig = _csv_signature(csv_path)
+        with self._lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO seeded(csv_path, signature) VALUES (?, ?)", (csv_path, sig))
+
+    # --- processed filings ---
+
+    def has_attachment(self, attachment):
+        with self._lock:
+            return self.db.execute("SELECT 1 FROM processed WHERE attachment=?",
+                                   (attachment_name(attachment),)).fetchone() is not None
+
+    def add(self, url, ticker, dissem_dt=None):
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO processed(attachment, ticker, url, dissem_dt, added_at) VALUES (?, ?, ?, ?, ?)",
+                (attachment_name(url), ticker, url, dissem_dt, datetime.now().isoformat(timespec="seconds"))
+            )
+
+    def add_records(self, records):
+        """Index CSV rows (dicts with 'url' and 'ticker') just written by a loader."""
+        for rec in records:
+            self.add(rec['url'], rec['ticker'])
+
+    def skip(self, attachment, ticker, reason, dissem_dt=None):
+        """Give up on a filing for good: has_attachment() is True from now on."""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO processed(attachment, ticker, url, dissem_dt, added_at, skipped) "
+                "VALUES (?, ?, NULL, ?, ?, ?)",
+                (attachment_name(attachment), ticker, dissem_dt, now, reason)
+            )
+            self.db.execute("DELETE FROM failures WHERE attachment=?", (attachment_name(attachment),))
+
+    def note_failure(self, attachment, ticker, error=None):
+        """Count a failed attempt at a filing; returns how many there have been."""
+        name = attachment_name(attachment)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT INTO failures(attachment, ticker, attempts, last_error, updated_at) VALUES (?, ?, 1, ?, ?) "
+                "ON CONFLICT(attachment) DO UPDATE SET attempts=attempts+1, last_error=excluded.last_error, "
+                "updated_at=excluded.updated_at",
+                (name, ticker, error, now)
+            )
+            return self.db.execute("SELECT attempts FROM failures WHERE attachment=?", (name,)).fetchone()[0]
+
+    # --- watermarks ---
+
+    def watermark(self, ticker):
+        """YYYYMMDD day the ticker's announcements are scanned through, or None."""
+        with self._lock:
+            row = self.db.execute("SELECT scanned_through FROM watermarks WHERE ticker=?",
+                                  (ticker,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, ticker, scanned_through, forward_only=True):
+        """Set a ticker's watermark; by default it only ever moves forward."""
+        current = self.watermark(ticker)
+        if forward_only and current and current >= scanned_through:
+            return
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO watermarks(ticker, scanned_through, updated_at) VALUES (?, ?, ?)",
+                (ticker, scanned_through, datetime.now().isoformat(timespec="seconds"))
+            )
+
+
+class WatermarkTracker:
+    """
+    Collects per-ticker outcomes during a refresh of the window ending `to`
+    (YYYYMMDD). Once all of a ticker's rows are settled, a complete fetch
+    moves its watermark to `to`, or back to the day of its oldest failed
+    filing, so that one is retried next run instead of skipped forever.
+
+    Filings that can never succeed are skipped() instead of failed(): they
+    go into the index as given up and don't hold the watermark back.
+    """
+
+    def __init__(self, index, to):
+        self.index = index
+        self.to = to
+        self._lock = threading.Lock()
+        self._state = {}  # ticker -> {"pending": n, "failed": [day, ...], "complete": bool}
+
+    def begin(self, ticker, rows, complete=True):
+        """complete=False (some listing pages failed) keeps the watermark where it is."""
+        with self._lock:
+            self._state[ticker] = {"pending": len(rows), "failed": [], "complete": complete}
+        if not rows:
+            self._finish(ticker)
+
+    def done(self, ticker, row):
+        self._settle(ticker, row, ok=True)
+
+    def skipped(self, ticker, row, reason):
+        """Record a filing as given up for good (see IngestIndex.skip) and settle it."""
+        self.index.skip(row.get("ATTACHMENTNAME", ""), ticker, reason, row.get("DissemDT") or None)
+        self._settle(ticker, row, ok=True)
+
+    def failed(self, ticker, row, error=None, give_up_after=None):
+        """
+        Retry the filing next run. With give_up_after, failures are counted
+        across runs and the filing is skipped once it reaches that many.
+        """
+        if give_up_after:
+            attempts = self.index.note_failure(row.get("ATTACHMENTNAME", ""), ticker, error)
+            if attempts >= give_up_after:
+                self.skipped(ticker, row, f"{error or 'failed'} ({attempts} attempts)")
+                return
+        self._settle(ticker, row, ok=False)
+
+    def _settle(self, ticker, row, ok):
+        with self._lock:
+            st = self._state[ticker]
+            if not ok:
+                st["failed"].append(_day(row.get("DissemDT", "")))
+            st["pending"] -= 1
+            finished = st["pending"] == 0
+        if finished:
+            self._finish(ticker)
+
+    def _finish(self, ticker):
+        with self._lock:
+            st = self._state.pop(ticker)
+        if not st["complete"] or not all(st["failed"]):
+            return  # rows we never saw, or an undated failure, may be older than anything
+        if st["failed"]:
+            # may move back: a sweep or backfill can fail rows older than the watermark
+            self.index.set_watermark(ticker, min(st["failed"]), forward_only=False)
+        else:
+            self.index.set_watermark(ticker, self.to)
+
+
+def _day(dissem_dt):
+    """DissemDT ('2026-05-01T10:00:00') -> '20260501', '' when missing."""
+    return str(dissem_dt or "").split("T")[0].replace("-", "")
+
+
+def watermark_window_start(index, ticker, default_start):
+    """
+    strPrevDate for a ticker: the day its watermark is scanned through, else
+    default_start (the look-back window). Dates are YYYYMMDD strings.
+    """
+    return index.watermark(ticker) or default_start
+
+
+_indexes = {}
+_index_lock = threading.Lock()
+
+
+def get_index(path=INDEX_PATH):
+    """Process-wide shared index per file (opened on first use)."""
+    with _index_lock:
+        if path not in _indexes:
+            _indexes[path] = IngestIndex(path)
+        return _indexes[path]
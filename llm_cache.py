@@ -0,0 +1,192 @@
+# llm_cache.py
+# Disk-backed cache of GPT responses, so identical requests aren't paid for
+# twice: the same filing summarized again from the table button, two users
+# pasting the same URL, a refresh re-running over already seen text.
+#
+# Entries are keyed by (prompt name + template version, model, hash of the
+# inputs) and live in one SQLite file. Bump a prompt's version in its
+# @llm_cached decorator whenever its template changes, so old answers
+# aren't served for the new prompt. Entries expire after LLM_CACHE_TTL_DAYS
+# and the least recently used are dropped beyond LLM_CACHE_MAX_MB.
+#
+#   python llm_cache.py            # hit rate and size
+#   python llm_cache.py --purge    # drop expired entries
+
+import argparse
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 86400
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    prompt     TEXT NOT NULL,   -- name:version
+    model      TEXT,
+    response   TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    created    REAL,
+    last_used  REAL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);
+"""
+
+
+def cache_key(prompt, model, inputs):
+    h = hashlib.sha256()
+    for part in (prompt, model or "", inputs):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class LlmCache:
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            self.db.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, prompt, model, inputs):
+        key = cache_key(prompt, model, inputs)
+        now = time.time()
+        with self._lock, self.db:
+            row = self.db.execute("SELECT response, created FROM responses WHERE key=?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self.db.execute("DELETE FROM responses WHERE key=?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE responses SET last_used=?, hits=hits+1 WHERE key=?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, prompt, model, inputs, response):
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses(key, prompt, model, response, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(prompt, model, inputs), prompt, model, response, len(response.encode("utf-8")), now, now)
+            )
+        self._evict()
+
+    def purge_expired(self):
+        with self._lock, self.db:
+            return self.db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)).rowcount
+
+    def _evict(self):
+        """Drop least-recently-used responses until under max_bytes."""
+        with self._lock:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            with self.db:
+                for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self.db.execute("DELETE FROM responses WHERE key=?", (key,))
+                    total -= size
+
+    def stats(self):
+        """This process's hits/misses, plus what the cache file has saved over its lifetime."""
+        with self._lock:
+            entries, size, saved = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries, "bytes": size, "calls_saved_total": saved}
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache(path=None):
+    """Process-wide shared cache per file (opened on first use)."""
+    path = path or LLM_CACHE_PATH
+    with _cache_lock:
+        if path not in _caches:
+            _caches[path] = LlmCache(path)
+        return _caches[path]
+
+
+def llm_cache_stats():
+    return get_llm_cache().stats()
+
+
+def _is_json(response):
+    try:
+        json.loads(response)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def llm_cached(prompt, version, model=None):
+    """
+    Cache a GPT call site: fn(...) -> JSON string or None. The key is the
+    prompt name:version, the model (`model`, else the call's gpt_model
+    argument) and a hash of all other arguments. Only responses that parse
+    as JSON are stored; failures (None) and malformed output are retried
+    next time.
+    """
+    def wrap(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def cached(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            used_model = model or arguments.pop("gpt_model", None)
+            inputs = json.dumps(arguments, sort_keys=True, default=str)
+            name = f"{prompt}:{version}"
+            cache = get_llm_cache()
+            response = cache.get(name, used_model, inputs)
+            if response is not None:
+                return response
+            response = fn(*args, **kwargs)
+            if isinstance(response, str) and _is_json(response):
+                cache.put(name, used_model, inputs, response)
+            return response
+        return cached
+    return wrap
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GPT response cache")
+    parser.add_argument("--purge", action="store_true", help="drop expired entries")
+    args = parser.parse_args()
+    cache = get_llm_cache()
+    if args.purge:
+        print(f"Purged {cache.purge_expired()} expired responses")
+    stats = cache.stats()
+    with cache._lock:
+        by_prompt = cache.db.execute(
+            "SELECT prompt, model, COUNT(*), SUM(hits) FROM responses GROUP BY prompt, model ORDER BY prompt").fetchall()
+    print(f"{stats['entries']} responses, {stats['bytes'] / 2**20:.1f} MB, {stats['calls_saved_total']} GPT calls saved")
+    for prompt, model, n, hits in by_prompt:
+        print(f"  {prompt:<32} {model or '':<14} {n:>6} responses {hits:>6} hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -254,7 +254,11 @@ if st.session_state.page == "landing":
 
 # Sidebar controls
 st.sidebar.header("Controls")
-days = st.sidebar.number_input("Days to look back", min_value=1, max_value=365, value=10)
+days = st.sidebar.number_input("Days to look back (new tickers / backfill)", min_value=1, max_value=365, value=10,
+                               help="Tickers refreshed before continue from where the last refresh got to")
+backfill = st.sidebar.checkbox("Backfill", value=False, help="Re-scan the look-back window for every ticker")
+workers = st.sidebar.number_input("Parallel tickers", min_value=1, max_value=16, value=4)
+sweep = st.sidebar.checkbox("Market-wide sweep", value=False, help="Fetch all exchange announcements once and filter by watchlist")
 debug = True
 magic_key_entered = st.sidebar.text_input("Enter Magic Key to Refresh", type="password")
 refresh_button = st.sidebar.button("🔄 Refresh Filings Data")
@@ -280,10 +284,14 @@ if refresh:
     def progress(p): progress_ph.progress(p)
     from data_loader import load_filtered_data as raw_loader  # use uncached version to refresh
     #new_count = update_filings_data(days=days, debug=debug, status_callback=status, progress_callback=progress, log_callback=log, zenrows_api_key=zenrows_api_key)
-    new_count = update_filings_data(days=days, debug=debug, status_callback=status, progress_callback=progress, log_callback=log)
+    new_count = update_filings_data(days=days, debug=debug, status_callback=status, progress_callback=progress, log_callback=log, max_workers=workers, sweep=sweep,
+                                    use_watermarks=not backfill)
     
     elapsed = time.time() - start_time
-    status_ph.text(f"Completed in {elapsed:.1f}s — {new_count} new filings added.")
+    if new_count is None:
+        status_ph.text("⏩ Another refresh is already running — try again once it finishes.")
+    else:
+        status_ph.text(f"Completed in {elapsed:.1f}s — {new_count} new filings added.")
     progress_ph.empty()
 else:
     from streamlit.runtime.caching import cache_data
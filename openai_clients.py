@@ -0,0 +1,62 @@
+# openai_clients.py
+# One OpenAI client per process (per API key / base URL), shared by every
+# GPT and Whisper call site: data_loader.call_gpt, the bonus_summary
+# summarizers, answer_a_question and the Whisper transcription.
+#
+# Building OpenAI(...) per call threw away its connection pool, so every
+# call paid DNS + TCP + TLS again and re-read st.secrets. The shared client
+# sits on one httpx.Client with keep-alive connections, sized for the
+# parallel callers (refresh GPT stage, chunked transcription), and has
+# explicit timeouts instead of the SDK's 10-minute default.
+
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT_S", "60"))   # per chat completion
+OPENAI_CONNECT_TIMEOUT = 10.0
+OPENAI_MAX_CONNECTIONS = 32   # >= refresh gpt_workers + transcription threads
+OPENAI_MAX_RETRIES = 2        # the SDK's own backoff on 429/5xx/connection errors
+
+
+def get_secret(name):
+    """st.secrets value, falling back to the environment (headless runs have no secrets.toml)."""
+    try:
+        import streamlit as st
+        return st.secrets.get(name, os.getenv(name))
+    except Exception:
+        return os.getenv(name)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_default_key = None
+
+
+def get_openai_client(api_key=None, base_url=None) -> OpenAI:
+    """
+    Process-wide OpenAI client. OPENAI_API_KEY is resolved once (see
+    get_secret) unless given; base_url defaults to OPENAI_BASE_URL as
+    in the SDK. Use client.with_options(timeout=...) for slower calls --
+    it shares the same connection pool.
+    """
+    global _default_key
+    with _clients_lock:
+        if api_key is None:
+            if _default_key is None:
+                _default_key = get_secret("OPENAI_API_KEY")
+            api_key = _default_key
+        base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        key = (api_key, base_url)
+        if key not in _clients:
+            http_client = httpx.Client(
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS, keepalive_expiry=60),
+            )
+            _clients[key] = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                                   timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+                                   max_retries=OPENAI_MAX_RETRIES)
+        return _clients[key]
@@ -0,0 +1,113 @@
+# pdf_text.py
+# PDF text extraction kept in its own light module so it can run in
+# worker processes without importing streamlit/pandas.
+#
+# Several engines sit behind extract_pdf_text; only PyPDF2 is required:
+#   pypdf2    PyPDF2 (requirements.txt)
+#   pdfminer  pdfminer.six layout analysis   (pip install pdfminer.six)
+#   pdfium    Chrome's PDFium via pypdfium2  (pip install pypdfium2)
+# The engine is PDF_ENGINE if set, else the one bench_pdf_engines.py last
+# picked for this deployment (PDF_ENGINE_FILE), else pypdf2.
+
+import json
+import os
+from io import BytesIO
+
+PDF_ENGINE_FILE = os.getenv("PDF_ENGINE_FILE", "data/cache/pdf_engine.json")
+DEFAULT_ENGINE = "pypdf2"
+
+
+def _pypdf2_pages(pdf):
+    from PyPDF2 import PdfReader
+    source = BytesIO(pdf) if isinstance(pdf, (bytes, bytearray)) else pdf
+    for p in PdfReader(source).pages:
+        yield p.extract_text() or ""
+
+
+def _pdfminer_pages(pdf):
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    source = BytesIO(pdf) if isinstance(pdf, (bytes, bytearray)) else pdf
+    for layout in extract_pages(source):  # lazy, one page at a time
+        yield "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+
+
+def _pdfium_pages(pdf):
+    import pypdfium2 as pdfium
+    doc = pdfium.PdfDocument(bytes(pdf) if isinstance(pdf, bytearray) else pdf)
+    try:
+        for i in range(len(doc)):
+            page = doc[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        doc.close()
+
+
+ENGINES = {
+    "pypdf2": (_pypdf2_pages, "PyPDF2"),
+    "pdfminer": (_pdfminer_pages, "pdfminer"),
+    "pdfium": (_pdfium_pages, "pypdfium2"),
+}
+
+
+def available_engines():
+    """Engines whose library is importable here."""
+    out = []
+    for name, (_, module) in ENGINES.items():
+        try:
+            __import__(module)
+            out.append(name)
+        except ImportError:
+            pass
+    return out
+
+
+_default = None
+
+
+def default_engine():
+    global _default
+    if _default is None:
+        name = os.getenv("PDF_ENGINE")
+        if not name and os.path.exists(PDF_ENGINE_FILE):
+            try:
+                with open(PDF_ENGINE_FILE) as f:
+                    name = json.load(f).get("engine")
+            except (OSError, ValueError):
+                name = None
+        _default = name if name in available_engines() else DEFAULT_ENGINE
+    return _default
+
+
+def iter_pdf_pages(pdf, engine=None):
+    """Page texts of `pdf` (bytes or path), parsed lazily by the given engine."""
+    return ENGINES[engine or default_engine()][0](pdf)
+
+
+def extract_pdf_text(pdf, max_chars=None, max_pages=None, engine=None) -> str:
+    """
+    Text of the PDF's pages, separated by form feeds. `pdf` is bytes or a
+    file path. Pages are parsed only until max_chars characters or
+    max_pages pages have been collected, and the result is cut to max_chars.
+    `engine` overrides default_engine(). Raises on unreadable PDFs.
+    """
+    pages = iter_pdf_pages(pdf, engine)
+    parts, size = [], 0
+    try:
+        for i, t in enumerate(pages):
+            if max_pages is not None and i >= max_pages:
+                break
+            t = ("\f" if i else "") + t + "\n"  # form feed between pages (boilerplate.py uses it)
+            parts.append(t)
+            size += len(t)
+            if max_chars and size >= max_chars:
+                break
+    finally:
+        pages.close()  # release the document right away when stopping early
+    text = "".join(parts)
+    return text[:max_chars] if max_chars else text
@@ -0,0 +1,112 @@
+# rate_limit.py
+# Adaptive per-host token-bucket rate limiter shared by every BSE loader.
+#
+# Each host gets a bucket refilled at `rate` requests/s. Healthy responses
+# nudge the rate up (additive increase); 429/403 or transport errors cut
+# it in half (multiplicative decrease) and honour Retry-After. Other 5xx
+# are left to the retry policy and circuit breaker (retry_policy.py): a
+# flaky mirror is not a sign we are sending too fast. The crawl
+# therefore runs as fast as BSE tolerates instead of sleeping a guessed
+# random delay before every request.
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+from retry_policy import retry_after_seconds
+
+THROTTLE_STATUSES = {403, 429}
+
+# Per-host settings: initial / min / max requests per second
+HOST_RATES = {
+    "api.bseindia.com": {"rate": 3.0, "min_rate": 0.2, "max_rate": 15.0},
+    "www.bseindia.com": {"rate": 4.0, "min_rate": 0.2, "max_rate": 20.0},
+}
+DEFAULT_RATE = {"rate": 50.0, "min_rate": 1.0, "max_rate": 200.0}
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rate=3.0, min_rate=0.2, max_rate=15.0, burst=2.0,
+                 increase=0.1, decrease=0.5, cooldown=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown  # min seconds between two rate cuts
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.ok = 0
+
+    def _reserve(self):
+        """Take one token (possibly going negative) and return seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record(self, status=None, retry_after=None):
+        """
+        Feed back a response status (None = transport error / timeout).
+        retry_after: seconds from a Retry-After header, if any.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if status is not None and status < 400:
+                self.ok += 1
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                return
+            if status is not None and status not in THROTTLE_STATUSES:
+                return  # 404, 5xx etc. say nothing about our request rate
+            self.throttled += 1
+            if now - self._last_cut >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_cut = now
+                self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + float(retry_after))
+
+    def record_response(self, response):
+        """record() from a requests/httpx response object."""
+        self.record(response.status_code, retry_after_seconds(response))
+
+    def stats(self):
+        return {"rate": round(self.rate, 2), "ok": self.ok, "throttled": self.throttled}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url_or_host) -> AdaptiveRateLimiter:
+    """Process-wide limiter for the host of a URL (or a bare host name)."""
+    host = urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host
+    host = host or ""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = AdaptiveRateLimiter(**HOST_RATES.get(host, DEFAULT_RATE))
+        return _limiters[host]
+
+
+def limiter_stats():
+    with _limiters_lock:
+        return {host: lim.stats() for host, lim in _limiters.items()}
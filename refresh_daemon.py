@@ -0,0 +1,118 @@
+# refresh_daemon.py
+# Headless filings refresh: runs update_filings_data on a schedule outside
+# the Streamlit app, so ingestion keeps going in the background and the UI
+# only reads the CSVs.
+#
+#   python refresh_daemon.py --once                 # single refresh and exit
+#   python refresh_daemon.py --workers 8 --sweep    # run forever
+#
+# Secrets (OPENAI_API_KEY, GITHUB_TOKEN) come from .streamlit/secrets.toml
+# when present, else from the environment.
+
+import argparse
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from data_loader import update_filings_data, OUTPUT_DIR
+from run_lock import acquire_lock, release_lock
+
+IST = ZoneInfo("Asia/Kolkata")
+# BSE posts most filings between the pre-open and a couple of hours after
+# the close (results, board outcomes), so that window gets the short interval.
+ACTIVE_START = (9, 0)
+ACTIVE_END = (18, 30)
+
+stop = threading.Event()
+
+
+def log(msg):
+    print(f"{datetime.now(IST):%Y-%m-%d %H:%M:%S} {msg}", flush=True)
+
+
+def is_active(now):
+    """True on weekdays inside the ACTIVE_START-ACTIVE_END window (IST)."""
+    if now.weekday() >= 5:
+        return False
+    return ACTIVE_START <= (now.hour, now.minute) < ACTIVE_END
+
+
+def next_run(now, interval_min, idle_interval_min):
+    """
+    Next refresh time after `now` (IST). Inside the active window runs are
+    aligned to multiples of interval_min from the window start; outside it
+    they are idle_interval_min apart, but never later than the next window open.
+    """
+    day_start = now.replace(hour=ACTIVE_START[0], minute=ACTIVE_START[1], second=0, microsecond=0)
+    if is_active(now):
+        steps = int((now - day_start).total_seconds() // (interval_min * 60)) + 1
+        return day_start + timedelta(minutes=interval_min * steps)
+
+    candidate = now + timedelta(minutes=idle_interval_min)
+    opening = day_start if now < day_start else day_start + timedelta(days=1)
+    while opening.weekday() >= 5:
+        opening += timedelta(days=1)
+    return min(candidate, opening)
+
+
+def refresh_once(args):
+    lock = acquire_lock(args.output_dir)
+    if not lock:
+        log("⏩ Another refresh is running, skipping this slot")
+        return None
+    t0 = time.monotonic()
+    try:
+        count = update_filings_data(
+            days=args.days, debug=args.debug,
+            status_callback=log if args.debug else None,
+            log_callback=log,
+            max_workers=args.workers, max_downloads=args.max_downloads,
+            max_gpt_calls=args.max_gpt_calls, output_dir=args.output_dir,
+            upload=not args.no_upload, sweep=args.sweep, use_watermarks=not args.backfill
+        )
+        args.backfill = False  # later runs pick up from the watermarks again
+        log(f"✅ Refresh done: {count} new filings in {time.monotonic() - t0:.0f}s")
+        return count
+    except Exception as e:
+        log(f"❌ Refresh failed: {e}")
+        return None
+    finally:
+        release_lock(lock)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduled BSE filings refresh")
+    parser.add_argument("--once", action="store_true", help="run a single refresh and exit")
+    parser.add_argument("--interval", type=int, default=15, help="minutes between runs in market hours")
+    parser.add_argument("--idle-interval", type=int, default=120, help="minutes between runs otherwise")
+    parser.add_argument("--days", type=int, default=2, help="look-back for tickers without a watermark")
+    parser.add_argument("--backfill", action="store_true", help="first run re-scans --days for every ticker")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-downloads", type=int, default=None)
+    parser.add_argument("--max-gpt-calls", type=int, default=None)
+    parser.add_argument("--sweep", action="store_true", help="market-wide sweep instead of per-scrip paging")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--no-upload", action="store_true", help="don't push CSVs to GitHub")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    if args.once:
+        refresh_once(args)
+        return
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())  # finish the current run, then exit
+
+    log(f"Refresh daemon started: every {args.interval} min in market hours, {args.idle_interval} min otherwise")
+    while not stop.is_set():
+        refresh_once(args)
+        when = next_run(datetime.now(IST), args.interval, args.idle_interval)
+        log(f"Next refresh at {when:%Y-%m-%d %H:%M}")
+        stop.wait(max(0.0, (when - datetime.now(IST)).total_seconds()))
+    log("Refresh daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# refresh_journal.py
+# Append-only checkpoint journal for a filings refresh job.
+#
+# Every completed step is one JSON line, flushed and fsync'd:
+#   {"event": "start",      "params": {...}}
+#   {"event": "fetched",    "ticker": ..., "rows": [...]}          announcements pulled from BSE
+#   {"event": "summarized", "ticker": ..., "attachment": ..., "record": {...}}   GPT result
+#   {"event": "finish",     "total_new": n}
+#
+# If the process dies mid-refresh, the next update_filings_data call finds the
+# unfinished journal, replays it and carries on: fetched tickers are not
+# re-queried and summarized filings are written out without another GPT call.
+# Rows already appended are recognised through the ingest index, so they
+# aren't journaled. A finished job's journal is deleted, and jobs older than
+# REFRESH_RESUME_MAX_HOURS are not resumed (their window is long gone).
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+MAX_RESUME_AGE = timedelta(hours=float(os.getenv("REFRESH_RESUME_MAX_HOURS", "24")))
+JOB_ID_FORMAT = "%Y%m%d-%H%M%S-%f"
+
+
+class RefreshJournal:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.params = None
+        self.finished = False
+        self.fetched = {}      # ticker -> rows
+        self.summarized = {}   # (ticker, attachment) -> record
+        self._f = None         # opened for append on the first write
+        if os.path.exists(path):
+            self._replay()
+
+    @property
+    def job_id(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    @property
+    def started_at(self):
+        try:
+            return datetime.strptime(self.job_id, JOB_ID_FORMAT)
+        except ValueError:
+            return datetime.fromtimestamp(os.path.getmtime(self.path))
+
+    def _replay(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                kind = ev.get("event")
+                if kind == "start":
+                    self.params = ev.get("params")
+                elif kind == "fetched":
+                    self.fetched[ev["ticker"]] = ev["rows"]
+                elif kind == "summarized":
+                    self.summarized[(ev["ticker"], ev["attachment"])] = ev["record"]
+                elif kind == "finish":
+                    self.finished = True
+
+    def _write(self, **event):
+        event["at"] = datetime.now().isoformat(timespec="seconds")
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            if self._f is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._f = open(self.path, "a", encoding="utf-8")
+            self._f.write(line + "\n")
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    # --- steps ---
+
+    def start(self, params):
+        if self.params is None:
+            self.params = params
+            self._write(event="start", params=params)
+
+    def record_fetched(self, ticker, rows):
+        self.fetched[ticker] = rows
+        self._write(event="fetched", ticker=ticker, rows=rows)
+
+    def record_summarized(self, ticker, attachment, record):
+        self.summarized[(ticker, attachment)] = record
+        self._write(event="summarized", ticker=ticker, attachment=attachment, record=record)
+
+    def finish(self, total_new):
+        """Mark the job done and delete its journal; nothing is left to resume."""
+        self.finished = True
+        self._write(event="finish", total_new=total_new)
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            if self._f is not None and not self._f.closed:
+                self._f.close()
+
+    # --- lookups ---
+
+    def summary_for(self, ticker, attachment):
+        """Journaled record for a filing that was summarized but maybe not yet persisted."""
+        return self.summarized.get((ticker, attachment))
+
+
+def open_job(jobs_dir, params, resume=True):
+    """
+    Resume the newest unfinished job in jobs_dir (if resume), else start a
+    new one. Returns the RefreshJournal; its .params are the ones the job
+    was started with, which win over `params` on resume.
+
+    Only the journals since the last finished job are candidates, and none
+    older than MAX_RESUME_AGE; unfinished journals past that age are deleted.
+    The caller must hold the output directory's run lock (run_lock.py).
+    """
+    os.makedirs(jobs_dir, exist_ok=True)
+    if resume:
+        oldest = datetime.now() - MAX_RESUME_AGE
+        for name in sorted(os.listdir(jobs_dir), reverse=True):
+            if not name.endswith(".jsonl"):
+                continue
+            journal = RefreshJournal(os.path.join(jobs_dir, name))
+            if journal.finished:
+                break  # everything older was superseded by this job
+            if journal.started_at < oldest:
+                os.remove(journal.path)
+                continue
+            if journal.params is not None:
+                return journal
+    job_id = datetime.now().strftime(JOB_ID_FORMAT)
+    journal = RefreshJournal(os.path.join(jobs_dir, f"{job_id}.jsonl"))
+    journal.start(params)
+    return journal
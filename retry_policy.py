@@ -0,0 +1,168 @@
+# retry_policy.py
+# Retries, retry budgets and circuit breakers for BSE endpoints.
+#
+# bse_http.py wraps every request in this policy:
+#   - transport errors and 429/5xx are retried with capped exponential
+#     backoff and full jitter (Retry-After, when sent, is a lower bound);
+#   - each endpoint has a retry budget: every request earns `ratio` of a
+#     retry token, every retry spends one, so a struggling BSE sees at most
+#     ~20% extra traffic instead of a retry storm;
+#   - each endpoint has a circuit breaker: after `threshold` consecutive
+#     failures it opens and requests fail fast with CircuitOpenError for
+#     `reset_after` seconds, then a single trial request decides whether
+#     it closes again.
+# An endpoint is host + path directory, e.g.
+# api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData or
+# www.bseindia.com/xml-data/corpfiling/AttachLive.
+
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def retry_after_seconds(response):
+    """Retry-After header of a requests/httpx response as seconds, or None."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, attempts=4, base_delay=0.5, max_delay=8.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt+1 (attempt is 0-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, min(retry_after, 60.0))
+        return delay
+
+
+class RetryBudget:
+    def __init__(self, ratio=0.2, reserve=10.0):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = reserve
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self):
+        """Called once per original (non-retry) request."""
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._balance >= 1.0:
+                self._balance -= 1.0
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    def allow(self):
+        """False while open; after reset_after lets exactly one trial request through."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_after:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def retry_in(self):
+        with self._lock:
+            return max(0.0, self.reset_after - (time.monotonic() - self._opened_at))
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def abandon(self):
+        """A request ended without a verdict on the endpoint (e.g. cancelled): free the trial slot."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial = False
+
+    def settle(self, ok):
+        """success() for True, failure() for False, abandon() for None."""
+        if ok is None:
+            self.abandon()
+        elif ok:
+            self.success()
+        else:
+            self.failure()
+
+
+class Endpoint:
+    def __init__(self, key):
+        self.key = key
+        self.breaker = CircuitBreaker()
+        self.budget = RetryBudget()
+
+    def stats(self):
+        return {"state": self.breaker.state, "trips": self.breaker.trips,
+                "retries": self.budget.retries, "retries_denied": self.budget.denied}
+
+
+def endpoint_key(url):
+    parts = urlparse(url)
+    return f"{parts.hostname or ''}{parts.path.rsplit('/', 1)[0]}"
+
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(url) -> Endpoint:
+    """Process-wide breaker + budget for the endpoint of a URL."""
+    key = endpoint_key(url)
+    with _endpoints_lock:
+        if key not in _endpoints:
+            _endpoints[key] = Endpoint(key)
+        return _endpoints[key]
+
+
+def endpoint_stats():
+    with _endpoints_lock:
+        return {key: ep.stats() for key, ep in _endpoints.items()}
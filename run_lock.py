@@ -0,0 +1,62 @@
+# run_lock.py
+# Per-output-directory lock so two refreshes (daemon, Streamlit button,
+# shards) never append to the same CSVs and index or resume each other's
+# live job journal.
+#
+# update_filings_data takes it itself; the daemon and shard_refresh take it
+# around their runs too. The lock is reentrant for the thread holding it, so
+# those nested acquisitions don't deadlock, while another thread of the same
+# Streamlit process (a second user's refresh) is turned away.
+#
+# It is an flock(2) on <output_dir>/.refresh.lock: the kernel drops it when
+# the holder exits, so there are no stale locks to clean up, and the file is
+# never deleted (deleting it would let two processes lock different inodes).
+# flock only coordinates processes on one host.
+
+import fcntl
+import os
+import threading
+
+LOCK_FILENAME = ".refresh.lock"
+
+_held = {}   # path -> [fd, thread ident, depth]
+_held_lock = threading.Lock()
+
+
+def acquire_lock(output_dir):
+    """
+    Exclusive lock on output_dir. Returns the lock file path, or None when
+    another runner holds it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, LOCK_FILENAME)
+    with _held_lock:
+        entry = _held.get(path)
+        if entry is not None:
+            if entry[1] != threading.get_ident():
+                return None
+            entry[2] += 1
+            return path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:  # held by another process
+            os.close(fd)
+            return None
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())  # for whoever wonders who holds it
+        _held[path] = [fd, threading.get_ident(), 1]
+        return path
+
+
+def release_lock(path):
+    with _held_lock:
+        entry = _held.get(path)
+        if entry is None:
+            return
+        entry[2] -= 1
+        if entry[2] > 0:
+            return
+        del _held[path]
+        fcntl.flock(entry[0], fcntl.LOCK_UN)
+        os.close(entry[0])
@@ -0,0 +1,187 @@
+# shard_refresh.py
+# Sharded refresh across processes on one machine.
+#
+# Tickers are split into N shards by a stable hash of their BSE code. Each
+# shard runs update_filings_data on its own tickers into its own directory
+# (<root>/shard-<i>-of-<N>, with its own ingest index, job journal and lock),
+# and a merge step appends the new rows of every shard into the regular
+# per-ticker CSVs. Coordination is via the flock-based locks of run_lock.py,
+# which only hold between processes of the same host: don't point shards on
+# several machines at one shared (e.g. NFS) directory.
+#
+#   python shard_refresh.py --shards 4 --local          # 4 processes here, then merge
+#   python shard_refresh.py --shards 4 --shard 2        # one shard (e.g. its own cron entry)
+#   python shard_refresh.py --shards 4 --merge          # merge finished shards
+#
+# Note: each process has its own rate limiter, so N shards on one IP may hit
+# BSE N times harder until the limiters back off on 429/403. For the same
+# reason --sweep is refused with more than one shard: each shard would page
+# through the whole exchange listing.
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from data_loader import (tickers, update_filings_data, append_records, upload_ticker_csv,
+                         index_path_for, OUTPUT_DIR)
+from ingest_index import get_index, attachment_name
+from run_lock import acquire_lock, release_lock
+
+SHARD_ROOT = "data/shards"
+DONE_FILENAME = ".shard_done.json"
+
+
+def shard_of(tk, n_shards):
+    """Stable shard number for a ticker (md5 of its BSE code, not Python's salted hash)."""
+    digest = hashlib.md5(str(tk['bse_code']).encode()).digest()
+    return int.from_bytes(digest[:8], "big") % n_shards
+
+
+def shard_tickers(shard, n_shards, universe=None):
+    return [tk for tk in (universe or tickers) if shard_of(tk, n_shards) == shard]
+
+
+def shard_dir_for(root, shard, n_shards):
+    return os.path.join(root, f"shard-{shard:03d}-of-{n_shards:03d}")
+
+
+def seed_shard_index(shard_dir, mine, merged_dir):
+    """Teach the shard's index what the merged CSVs already hold, so shards never re-summarize them."""
+    shard_index = get_index(index_path_for(shard_dir))
+    merged_index = get_index(index_path_for(merged_dir))
+    for tk in mine:
+        shard_index.sync_csv(tk['name'], os.path.join(merged_dir, f"{tk['name']}.csv"))
+        wm = merged_index.watermark(tk['name'])
+        if wm:
+            shard_index.set_watermark(tk['name'], wm)
+
+
+def run_shard(shard, n_shards, root=SHARD_ROOT, merged_dir=OUTPUT_DIR, log_callback=print, **kwargs):
+    """
+    Refresh the tickers of one shard into its own directory. Extra kwargs go
+    to update_filings_data. Returns new filings, or None if the shard is busy.
+    """
+    if kwargs.get("sweep") and n_shards > 1:
+        raise ValueError("sweep=True would pull the whole exchange listing once per shard")
+    shard_dir = shard_dir_for(root, shard, n_shards)
+    mine = shard_tickers(shard, n_shards)
+    lock = acquire_lock(shard_dir)
+    if not lock:
+        log_callback(f"⏩ Shard {shard}/{n_shards} is locked by another process")
+        return None
+    try:
+        seed_shard_index(shard_dir, mine, merged_dir)
+        t0 = time.monotonic()
+        count = update_filings_data(ticker_list=mine, output_dir=shard_dir, upload=False,
+                                    log_callback=log_callback, **kwargs)
+        done = {"shard": shard, "shards": n_shards, "tickers": len(mine), "new": count,
+                "seconds": round(time.monotonic() - t0, 1),
+                "finished_at": datetime.now().isoformat(timespec="seconds")}
+        tmp = os.path.join(shard_dir, DONE_FILENAME + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(done, f)
+        os.replace(tmp, os.path.join(shard_dir, DONE_FILENAME))
+        log_callback(f"✅ Shard {shard}/{n_shards}: {count} new filings for {len(mine)} tickers")
+        return count
+    finally:
+        release_lock(lock)
+
+
+def merge_shards(root=SHARD_ROOT, merged_dir=OUTPUT_DIR, upload=False, debug=False, log_callback=print):
+    """
+    Append every shard row whose attachment isn't in merged_dir yet to the
+    merged per-ticker CSV, and carry shard watermarks over. Idempotent;
+    shards that are running (locked) are left for the next merge.
+    Returns number of rows merged.
+    """
+    merged_lock = acquire_lock(merged_dir)
+    if not merged_lock:
+        log_callback("⏩ Output directory is locked by a running refresh, not merging")
+        return 0
+    by_name = {tk['name']: tk for tk in tickers}
+    merged_index = get_index(index_path_for(merged_dir))
+    touched = {}
+    total = 0
+    try:
+        for shard_dir in sorted(glob.glob(os.path.join(root, "shard-*-of-*"))):
+            lock = acquire_lock(shard_dir)
+            if not lock:
+                log_callback(f"⏩ {os.path.basename(shard_dir)} is still running, skipping")
+                continue
+            try:
+                shard_index = get_index(index_path_for(shard_dir))
+                for shard_csv in sorted(glob.glob(os.path.join(shard_dir, "*.csv"))):
+                    name = os.path.splitext(os.path.basename(shard_csv))[0]
+                    merged_csv = os.path.join(merged_dir, f"{name}.csv")
+                    merged_index.sync_csv(name, merged_csv)
+                    with open(shard_csv, newline="", encoding="utf-8") as f:
+                        rows = [r for r in csv.DictReader(f)
+                                if r.get("url") and not merged_index.has_attachment(attachment_name(r["url"]))]
+                    if rows:
+                        append_records(merged_csv, rows, merged_index)
+                        touched[merged_csv] = name
+                        total += len(rows)
+                    wm = shard_index.watermark(name)
+                    if wm:
+                        merged_index.set_watermark(name, wm)
+            finally:
+                release_lock(lock)
+    finally:
+        release_lock(merged_lock)
+
+    if upload:
+        for merged_csv, name in touched.items():
+            if name in by_name:
+                upload_ticker_csv(by_name[name], merged_csv, debug, log_callback)
+    log_callback(f"🔀 Merged {total} new rows into {len(touched)} CSVs")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded BSE filings refresh")
+    parser.add_argument("--shards", type=int, required=True, help="total number of shards")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--shard", type=int, help="run this shard number (0-based)")
+    mode.add_argument("--local", action="store_true", help="run every shard as a local process, then merge")
+    mode.add_argument("--merge", action="store_true", help="only merge finished shards")
+    parser.add_argument("--root", default=SHARD_ROOT)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="merged output directory")
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=4, help="pipeline workers per shard")
+    parser.add_argument("--sweep", action="store_true", help="market-wide sweep; only with --shards 1")
+    parser.add_argument("--no-upload", action="store_true", help="don't push merged CSVs to GitHub")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+    if args.sweep and args.shards > 1:
+        # every shard would pull the full exchange listing: N times the traffic the sweep saves
+        parser.error("--sweep fetches the whole exchange in every shard; drop it or use refresh_daemon.py --sweep")
+
+    if args.shard is not None:
+        if not 0 <= args.shard < args.shards:
+            parser.error("--shard must be in [0, --shards)")
+        run_shard(args.shard, args.shards, root=args.root, merged_dir=args.output_dir,
+                  days=args.days, max_workers=args.workers, sweep=args.sweep, debug=args.debug)
+        return
+
+    if args.local:
+        common = ["--shards", str(args.shards), "--root", args.root, "--output-dir", args.output_dir,
+                  "--days", str(args.days), "--workers", str(args.workers)]
+        common += ["--sweep"] * args.sweep + ["--debug"] * args.debug
+        procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--shard", str(i)] + common)
+                 for i in range(args.shards)]
+        failed = [i for i, p in enumerate(procs) if p.wait() != 0]
+        if failed:
+            print(f"❌ Shards failed: {failed}")
+
+    merge_shards(args.root, args.output_dir, upload=not args.no_upload, debug=args.debug)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import pytest
+
+import boilerplate
+
+RESULTS = """Statement of Standalone Audited Financial Results
+Particulars
+Quarter ended
+Revenue from operations
+1,234.56
+1,100.20
+4,560.00
+Other income
+12.30
+10.10
+45.00
+Total
+1,246.86
+1,110.30
+4,605.00
+Total expenses
+812.00
+Profit before tax
+434.86
+Total
+1,246.86
+"""
+
+LETTER = """ACME Industries Limited, Regd. Office: 12, Industrial Estate, Pune
+To,
+BSE Limited
+Phiroze Jeejeebhoy Towers, Dalal Street
+Scrip Code: 500123
+Dear Sir/Madam,
+Sub: {subject}
+{body}
+Thanking you,
+Yours faithfully,
+Ravi Kumar, Company Secretary and Compliance Officer
+"""
+
+
+@pytest.fixture(autouse=True)
+def model_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(boilerplate, "BOILERPLATE_DB", str(tmp_path / "boilerplate.sqlite"))
+
+
+def test_results_table_figures_and_labels_survive():
+    text, _, _ = boilerplate.strip_boilerplate("ACME", RESULTS)
+    assert text.splitlines() == [l for l in RESULTS.splitlines() if l]
+
+
+def test_learned_labels_are_not_stripped_from_results():
+    for _ in range(5):
+        boilerplate.learn_boilerplate("ACME", RESULTS)
+    text, _, _ = boilerplate.strip_boilerplate("ACME", RESULTS)
+    assert "Total expenses" in text and "434.86" in text
+    assert text.count("1,246.86") == 2
+
+
+def test_letter_boilerplate_removed_and_learned():
+    first = LETTER.format(subject="Order win", body="Received an order worth Rs 120 crore from a state utility.")
+    text, before, after = boilerplate.strip_boilerplate("ACME", first)
+    assert "Dalal Street" not in text and "Scrip Code" not in text and "Thanking you" not in text
+    assert "Rs 120 crore" in text and after < before
+
+    for i in range(3):
+        boilerplate.learn_boilerplate("ACME", LETTER.format(subject=f"Update {i}", body=f"Routine update number {i}, nothing material."))
+    text, _, _ = boilerplate.strip_boilerplate("ACME", first)
+    assert "Regd. Office" not in text  # learned letterhead
+    assert "Rs 120 crore" in text
+
+
+def test_repeated_page_header_deduped_but_not_body_lines():
+    page = "ACME Industries Limited, Pune, Maharashtra\n" + "\n".join(f"Paragraph {i} of the disclosure, see details." for i in range(20))
+    text, _, _ = boilerplate.strip_boilerplate("ACME", page + "\f" + page)
+    assert text.count("ACME Industries Limited, Pune, Maharashtra") == 1
+    assert text.count("Paragraph 10 of the disclosure, see details.") == 2  # mid-page, never deduped
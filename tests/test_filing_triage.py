@@ -0,0 +1,48 @@
+import pytest
+
+from filing_triage import FULL, HEADLINE, SKIP, Triage
+
+
+def row(category="Company Update", subcategory="General", headline=""):
+    return {"CATEGORYNAME": category, "SUBCATNAME": subcategory, "HEADLINE": headline}
+
+
+@pytest.fixture
+def triage():
+    return Triage()
+
+
+def test_results_category_is_full(triage):
+    assert triage.route(row("Result", "Financial Results", "Compliance under Regulation 74(5)")) == FULL
+
+
+def test_full_subcategories(triage):
+    assert triage.route(row(subcategory="Earnings Call Transcript")) == FULL
+    assert triage.route(row(subcategory="Award of Order / Receipt of Order")) == FULL
+
+
+def test_routine_subcategories_are_skipped(triage):
+    assert triage.route(row(subcategory="Certificate under SEBI (Depositories and Participants) Regulations, 2018 - 74 (5)")) == SKIP
+    assert triage.route(row(subcategory="Closure of Trading Window")) == SKIP
+
+
+@pytest.mark.parametrize("headline", [
+    "Confirmation certificate for dematerialization of shares",
+    "Confirmation certificate for dematerialisation of shares",
+    "Closure of Trading Window",
+])
+def test_routine_headlines_are_skipped(triage, headline):
+    assert triage.route(row(headline=headline)) == SKIP
+
+
+def test_headline_subcategories(triage):
+    assert triage.route(row(subcategory="Credit Rating")) == HEADLINE
+    assert triage.route(row(subcategory="Analyst / Investor Meet - Intimation")) == HEADLINE
+
+
+def test_headline_headlines(triage):
+    assert triage.route(row(headline="Scrutinizer's Report and Voting Results of the AGM")) == HEADLINE
+
+
+def test_everything_else_is_full(triage):
+    assert triage.route(row(headline="Acquisition of 51% stake in XYZ Private Limited")) == FULL
@@ -0,0 +1,73 @@
+import pytest
+
+from ingest_index import IngestIndex, WatermarkTracker, attachment_name, blob_name, watermark_window_start
+
+
+def test_blob_name_maps_both_bse_mirrors_to_the_attachment():
+    attach = "5f1c2a4e-1b2c-4d5e-8f90-123456789abc.pdf"
+    for mirror in ("AttachLive", "AttachHis"):
+        url = f"https://www.bseindia.com/xml-data/corpfiling/{mirror}/{attach}"
+        assert blob_name(url) == attach == attachment_name(url)
+
+
+def test_blob_name_keeps_other_urls():
+    url = "https://example.com/reports/q1.pdf"
+    assert blob_name(url) == url
+
+
+
+@pytest.fixture
+def index(tmp_path):
+    return IngestIndex(str(tmp_path / "index.sqlite"))
+
+
+def row(day, attach):
+    return {"DissemDT": f"{day[:4]}-{day[4:6]}-{day[6:]}T10:00:00", "ATTACHMENTNAME": attach}
+
+
+def test_window_starts_at_the_watermark_else_the_lookback(index):
+    assert watermark_window_start(index, "TCS", "20261001") == "20261001"
+    index.set_watermark("TCS", "20260920")
+    assert watermark_window_start(index, "TCS", "20261001") == "20260920"
+
+
+def test_quiet_ticker_watermark_follows_the_window(index):
+    index.set_watermark("TCS", "20260501")
+    for to in ("20261015", "20261016", "20261017"):
+        tracker = WatermarkTracker(index, to)
+        tracker.begin("TCS", [])
+        assert index.watermark("TCS") == to
+
+
+def test_failed_filing_holds_the_watermark_at_its_day(index):
+    tracker = WatermarkTracker(index, "20261017")
+    a, b = row("20261010", "a.pdf"), row("20261012", "b.pdf")
+    tracker.begin("TCS", [a, b])
+    tracker.done("TCS", b)
+    tracker.failed("TCS", a)
+    assert index.watermark("TCS") == "20261010"
+
+
+def test_incomplete_fetch_keeps_the_watermark(index):
+    index.set_watermark("TCS", "20261001")
+    WatermarkTracker(index, "20261017").begin("TCS", [], complete=False)
+    assert index.watermark("TCS") == "20261001"
+
+
+def test_skipped_filing_is_indexed_and_does_not_hold_the_watermark(index):
+    tracker = WatermarkTracker(index, "20261017")
+    scanned = row("20261010", "scan.pdf")
+    tracker.begin("TCS", [scanned])
+    tracker.skipped("TCS", scanned, "no text")
+    assert index.has_attachment("scan.pdf")
+    assert index.watermark("TCS") == "20261017"
+
+
+def test_filing_is_given_up_after_repeated_failures(index):
+    bad = row("20261010", "bad.pdf")
+    for run, to in enumerate(("20261015", "20261016", "20261017"), 1):
+        tracker = WatermarkTracker(index, to)
+        tracker.begin("TCS", [bad])
+        tracker.failed("TCS", bad, "extract: timeout", give_up_after=3)
+        assert index.has_attachment("bad.pdf") == (run == 3)
+    assert index.watermark("TCS") == "20261017"
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from bse_http import BseHttpClient, ResponseTooLarge
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy, get_endpoint
+
+
+def tripped(reset_after=0.0):
+    breaker = CircuitBreaker(threshold=2, reset_after=reset_after)
+    breaker.failure()
+    breaker.failure()
+    return breaker
+
+
+def test_breaker_opens_after_threshold_failures():
+    breaker = tripped(reset_after=60)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 1
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = tripped()
+    assert breaker.allow()
+    assert not breaker.allow()  # the trial is still running
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = tripped()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 2
+
+
+def test_abandoned_trial_frees_the_slot():
+    breaker = tripped()
+    assert breaker.allow()
+    breaker.settle(None)
+    assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.allow()
+
+
+def test_budget_allows_about_ratio_extra_retries():
+    budget = RetryBudget(ratio=0.5, reserve=1.0)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_spend()
+    assert (budget.retries, budget.denied) == (2, 1)
+
+
+def run(url, attempt, attempts=1):
+    client = SimpleNamespace(retry=RetryPolicy(attempts=attempts, base_delay=0))
+    return asyncio.run(BseHttpClient._retrying(client, url, attempt))
+
+
+def half_open(url):
+    endpoint = get_endpoint(url)
+    endpoint.breaker = tripped()
+    return endpoint.breaker
+
+
+@pytest.mark.parametrize("error", [ResponseTooLarge("too big"), httpx.DecodingError("bad gzip"),
+                                   asyncio.CancelledError()])
+def test_trial_ending_in_other_errors_does_not_wedge_the_breaker(error):
+    url = f"https://bse.test/{type(error).__name__}/x.pdf"
+    breaker = half_open(url)
+
+    async def attempt():
+        raise error
+
+    with pytest.raises(type(error)):
+        run(url, attempt)
+    assert breaker.allow()
+
+
+def test_retryable_status_is_retried_then_returned():
+    url = "https://bse.test/status/x"
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        return httpx.Response(503 if len(calls) < 2 else 200)
+
+    assert run(url, attempt, attempts=3).status_code == 200
+    assert len(calls) == 2 and get_endpoint(url).breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_fails_fast():
+    url = "https://bse.test/open/x"
+    get_endpoint(url).breaker = tripped(reset_after=60)
+
+    async def attempt():
+        raise AssertionError("should not be called")
+
+    with pytest.raises(CircuitOpenError):
+        run(url, attempt)
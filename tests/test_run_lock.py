@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+import threading
+
+from run_lock import acquire_lock, release_lock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _other_process_gets_lock(output_dir):
+    code = f"from run_lock import acquire_lock; print(acquire_lock({str(output_dir)!r}) is not None)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return out.stdout.strip() == "True"
+
+
+def test_lock_is_reentrant_for_its_thread_only(tmp_path):
+    path = acquire_lock(tmp_path)
+    assert path and acquire_lock(tmp_path) == path
+    other = []
+    t = threading.Thread(target=lambda: other.append(acquire_lock(tmp_path)))
+    t.start()
+    t.join()
+    assert other == [None]
+    release_lock(path)
+    assert not _other_process_gets_lock(tmp_path)  # still held once
+    release_lock(path)
+    assert _other_process_gets_lock(tmp_path)
+
+
+def test_lock_of_a_dead_process_is_free(tmp_path):
+    assert _other_process_gets_lock(tmp_path)  # exits holding it
+    path = acquire_lock(tmp_path)
+    assert path and os.path.exists(path)
+    release_lock(path)
@@ -0,0 +1,16 @@
+from text_cache import TextCache
+
+
+def test_larger_limit_serves_smaller_request(tmp_path):
+    cache = TextCache(str(tmp_path))
+    cache.put("ab" * 32, "pypdf2", 1000, "x" * 1000)
+    assert cache.get("ab" * 32, "pypdf2", 400) == "x" * 400
+
+
+def test_partial_settles_for_a_shorter_extraction(tmp_path):
+    cache = TextCache(str(tmp_path))
+    sha = "cd" * 32
+    cache.put(sha, "pypdf2", 100, "y" * 100)
+    cache.put(sha, "pypdf2", 200, "z" * 200)
+    assert cache.get(sha, "pypdf2", 1000) is None
+    assert cache.get(sha, "pypdf2", 1000, partial=True) == "z" * 200
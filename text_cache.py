@@ -0,0 +1,144 @@
+# text_cache.py
+# Extracted document text, zlib-compressed on disk and keyed by the
+# document's SHA-256 (the same key the blob cache uses), so re-summarizing
+# a filing with a new prompt or model, or asking questions about it, needs
+# neither the PDF nor a parse.
+#
+# Entries live at <root>/<sha[:2]>/<sha>.<extractor>.<limit>.z, where
+# extractor is the PDF engine (or "html") and limit the max_chars the text
+# was extracted with ("full" for no limit). A text extracted with a larger
+# limit also serves smaller ones: it is cut the same way extract_pdf_text
+# would have cut it. Least recently used entries are dropped once the
+# directory exceeds TEXT_CACHE_MAX_MB.
+
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import zlib
+
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", "data/cache/text")
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+def sha256_of(data) -> str:
+    """SHA-256 of bytes or of a file at a path (read in chunks)."""
+    if isinstance(data, (bytes, bytearray)):
+        return hashlib.sha256(data).hexdigest()
+    h = hashlib.sha256()
+    with open(data, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TextCache:
+    def __init__(self, root=TEXT_CACHE_DIR, max_bytes=TEXT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total = sum(os.path.getsize(p) for p in self._entries())
+        self.hits = 0
+        self.misses = 0
+
+    def _entries(self, sha="*", extractor="*"):
+        return glob.glob(os.path.join(self.root, sha[:2] if sha != "*" else "??", f"{sha}.{extractor}.*.z"))
+
+    def _path(self, sha, extractor, max_chars):
+        return os.path.join(self.root, sha[:2], f"{sha}.{extractor}.{max_chars or 'full'}.z")
+
+    def get(self, sha, extractor, max_chars=None, partial=False):
+        """
+        Cached text of document `sha` as extracted with max_chars, or None.
+        partial=True settles for the longest text extracted with a smaller
+        limit when nothing covers max_chars.
+        """
+        fallback = None
+        for path in self._entries(sha, extractor):
+            limit = path.rsplit(".", 2)[1]
+            limit = None if limit == "full" else int(limit)
+            try:
+                with open(path, "rb") as f:
+                    text = zlib.decompress(f.read()).decode("utf-8")
+            except (OSError, zlib.error, UnicodeDecodeError):
+                continue
+            whole = limit is None or len(text) < limit  # extraction ran out of document
+            if not whole and (max_chars is None or limit < max_chars):
+                if partial and (fallback is None or len(text) > len(fallback[1])):
+                    fallback = (path, text)
+                continue
+            return self._hit(path, text[:max_chars] if max_chars else text)
+        if fallback:
+            return self._hit(*fallback)
+        self.misses += 1
+        return None
+
+    def _hit(self, path, text):
+        try:
+            os.utime(path)  # mtime is the LRU clock
+        except OSError:
+            pass
+        self.hits += 1
+        return text
+
+    def put(self, sha, extractor, max_chars, text):
+        path = self._path(sha, extractor, max_chars)
+        data = zlib.compress(text.encode("utf-8"), 6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        old = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)  # atomic: readers never see a partial entry
+        with self._lock:
+            self._total += len(data) - old
+        self._evict()
+
+    def get_or_extract(self, sha, extractor, max_chars, extract):
+        """Cached text, else extract() -- stored unless empty."""
+        text = self.get(sha, extractor, max_chars)
+        if text is None:
+            text = extract()
+            if text and text.strip():
+                self.put(sha, extractor, max_chars, text)
+        return text
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total
+
+    def _evict(self):
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return
+            entries = []
+            for path in self._entries():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            self._total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if self._total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._total -= size
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_text_cache(root=None):
+    """Process-wide shared cache per directory (opened on first use)."""
+    root = root or TEXT_CACHE_DIR
+    with _cache_lock:
+        if root not in _caches:
+            _caches[root] = TextCache(root)
+        return _caches[root]